@@ -0,0 +1,104 @@
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from city_grid import CityGrid, NeighborIndex
+
+INDEX_FIELDS = ('offsets', 'targets', 'reverse', 'costs', 'passable', 'weights')
+PRIVATE_FIELDS = ('passable', 'weights')
+
+_worker = {}
+
+def _attach(name, shape, dtype, private=False):
+    block = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    return block, array.copy() if private else array
+
+def _release(executor, blocks):
+    executor.shutdown()
+    for block in blocks:
+        block.close()
+        block.unlink()
+    blocks.clear()
+
+def _init_worker(grid_spec, terrain_spec, index_specs, dynamic_obstacles, landmark_dir=None, map_path=None):
+    from simulation import Simulation
+    blocks = []
+    arrays = {}
+    for field, spec in zip(INDEX_FIELDS, index_specs):
+        block, arrays[field] = _attach(*spec, private=field in PRIVATE_FIELDS)
+        blocks.append(block)
+    neighbor_index = NeighborIndex.from_arrays(**arrays)
+    if map_path is not None:
+        city = CityGrid.load(map_path, neighbor_index=neighbor_index)
+    else:
+        grid_block, grid = _attach(*grid_spec, private=True)
+        terrain_block, terrain_costs = _attach(*terrain_spec)
+        city = CityGrid.from_arrays(grid, terrain_costs, dynamic_obstacles, start_pos=(0, 0), goal_pos=(0, 0), copy=False,
+                                    neighbor_index=neighbor_index)
+        blocks += [grid_block, terrain_block]
+    _worker['blocks'] = blocks
+    _worker['simulation'] = Simulation(city, landmark_dir=landmark_dir)
+
+def _route_chunk(pairs, algorithm, time_step):
+    simulation = _worker['simulation']
+    simulation.time_step = time_step
+    simulation.city_grid.update_dynamic_obstacles(time_step)
+    return [simulation.route(tuple(start), tuple(goal), algorithm) for start, goal in pairs]
+
+class BatchRouter:
+    def __init__(self, city_grid, workers=None, landmark_dir=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.generation = city_grid.generation
+        self._blocks = []
+        map_path = city_grid.map_path
+        static_grid = np.where(city_grid.grid == -2, 0, city_grid.grid)
+        if map_path is not None:
+            grid_spec = terrain_spec = None
+        else:
+            grid_spec = self._share(static_grid)
+            terrain_spec = self._share(city_grid.terrain_costs)
+        index = city_grid.neighbor_index
+        passable = (static_grid >= 0).ravel()
+        weights = index.costs[index.targets]
+        weights[~passable[index.targets]] = np.inf
+        static = dict(offsets=index.offsets, targets=index.targets, reverse=index.reverse, costs=index.costs,
+                      passable=passable, weights=weights)
+        index_specs = [self._share(static[field]) for field in INDEX_FIELDS]
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(grid_spec, terrain_spec, index_specs, city_grid.dynamic_obstacles, landmark_dir, map_path)
+        )
+        self._finalizer = weakref.finalize(self, _release, self._executor, self._blocks)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+    
+    def _share(self, array):
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        self._blocks.append(block)
+        return block.name, array.shape, array.dtype.str
+    
+    def route(self, pairs, algorithm, time_step=0):
+        pairs = list(pairs)
+        if not pairs:
+            return []
+        chunk_size = max(1, -(-len(pairs) // (self.workers * 4)))
+        chunks = [pairs[i:i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+        results = []
+        for chunk_results in self._executor.map(_route_chunk, chunks, [algorithm] * len(chunks), [time_step] * len(chunks)):
+            results.extend(chunk_results)
+        return results
+    
+    def submit(self, pairs, algorithm, time_step=0):
+        return self._executor.submit(_route_chunk, list(pairs), algorithm, time_step)
+    
+    def close(self):
+        self._finalizer()
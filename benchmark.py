@@ -0,0 +1,147 @@
+import argparse
+import csv
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from city_grid import CityGrid
+from simulation import Simulation, ALGORITHMS, PLANNERS
+
+MAP_TYPES = ["small", "medium", "large", "dynamic"]
+RESULT_FIELDS = [
+    'map', 'size', 'algorithm', 'success', 'path_cost', 'optimal_cost', 'optimality_gap',
+    'nodes_expanded', 'nodes_per_sec', 'median_ns', 'mean_ns', 'min_ns', 'max_ns', 'peak_memory_bytes'
+]
+
+def build_scenarios(map_types, sizes, seed, obstacle_ratio):
+    for map_type in map_types:
+        yield map_type, CityGrid(map_type, seed=seed)
+    for size in sizes:
+        yield f"procedural-{size}", CityGrid("procedural", seed=seed, size=size,
+                                             num_dynamic_obstacles=int(size * obstacle_ratio))
+
+def _timed_search(simulation, algorithm):
+    city = simulation.city_grid
+    simulation.clear_search_state()
+    start_time = time.perf_counter_ns()
+    path, nodes_expanded = simulation.search(city.start_pos, city.goal_pos, algorithm)
+    return time.perf_counter_ns() - start_time, path, nodes_expanded
+
+def _peak_memory(simulation, algorithm):
+    simulation.clear_search_state()
+    tracemalloc.start()
+    try:
+        simulation.search(simulation.city_grid.start_pos, simulation.city_grid.goal_pos, algorithm)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def benchmark_algorithm(simulation, algorithm, optimal_cost, warmup, repeats):
+    for _ in range(warmup):
+        _timed_search(simulation, algorithm)
+    timings = []
+    for _ in range(repeats):
+        elapsed, path, nodes_expanded = _timed_search(simulation, algorithm)
+        timings.append(elapsed)
+    path_cost = simulation.route_cost(path)
+    median_ns = statistics.median(timings)
+    gap = None
+    if path is not None and optimal_cost:
+        gap = (path_cost - optimal_cost) / optimal_cost
+    return {
+        'algorithm': algorithm,
+        'success': path is not None,
+        'path_cost': path_cost,
+        'optimal_cost': optimal_cost,
+        'optimality_gap': gap,
+        'nodes_expanded': nodes_expanded,
+        'nodes_per_sec': nodes_expanded / (median_ns / 1e9) if median_ns else None,
+        'median_ns': median_ns,
+        'mean_ns': statistics.mean(timings),
+        'min_ns': min(timings),
+        'max_ns': max(timings),
+        'peak_memory_bytes': _peak_memory(simulation, algorithm)
+    }
+
+def run_benchmarks(algorithms, map_types, sizes, seed=0, time_step=0, warmup=1, repeats=5, obstacle_ratio=0.1):
+    results = []
+    for name, city in build_scenarios(map_types, sizes, seed, obstacle_ratio):
+        simulation = Simulation(city)
+        city.update_dynamic_obstacles(time_step)
+        simulation.time_step = time_step
+        reference, _ = simulation.search(city.start_pos, city.goal_pos, "Uniform Cost")
+        optimal_cost = simulation.route_cost(reference) if reference is not None else None
+        for algorithm in algorithms:
+            row = benchmark_algorithm(simulation, algorithm, optimal_cost, warmup, repeats)
+            row.update({'map': name, 'size': city.size})
+            results.append(row)
+            print(f"{name:>16} {algorithm:>18}: {row['median_ns'] / 1e6:9.3f} ms | "
+                  f"nodes {row['nodes_expanded']:>8} | gap {row['optimality_gap']}", file=sys.stderr)
+    return results
+
+def compare_to_baseline(results, baseline, tolerance):
+    previous = {(row['map'], row['algorithm']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        old = previous.get((row['map'], row['algorithm']))
+        if old is None:
+            continue
+        if row['median_ns'] > old['median_ns'] * (1 + tolerance):
+            regressions.append(f"{row['map']} {row['algorithm']}: median {old['median_ns'] / 1e6:.3f} ms -> {row['median_ns'] / 1e6:.3f} ms")
+        if row['nodes_expanded'] > old['nodes_expanded']:
+            regressions.append(f"{row['map']} {row['algorithm']}: nodes expanded {old['nodes_expanded']} -> {row['nodes_expanded']}")
+        if (row['optimality_gap'] or 0) > (old['optimality_gap'] or 0) + 1e-9:
+            regressions.append(f"{row['map']} {row['algorithm']}: optimality gap {old['optimality_gap']} -> {row['optimality_gap']}")
+    return regressions
+
+def write_csv(path, results):
+    with open(path, "w", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for row in results:
+            writer.writerow({field: row[field] for field in RESULT_FIELDS})
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pathfinding algorithms across map types and sizes.")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS) + list(PLANNERS))
+    parser.add_argument("--maps", nargs="*", default=MAP_TYPES)
+    parser.add_argument("--sizes", nargs="*", type=int, default=[64, 128, 256])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-step", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--csv")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+    
+    results = run_benchmarks(args.algorithms, args.maps, args.sizes, args.seed, args.time_step, args.warmup, args.repeats)
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'seed': args.seed,
+            'time_step': args.time_step,
+            'warmup': args.warmup,
+            'repeats': args.repeats
+        },
+        'results': results
+    }
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    if args.csv:
+        write_csv(args.csv, results)
+    
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare_to_baseline(results, json.load(handle), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,179 @@
 import numpy as np
 import random
+from functools import reduce
+from math import gcd
+import map_io
 from utils import manhattan_distance
 
+PROCEDURAL_DEFAULTS = {
+    'size': 1000,
+    'block_size': 10,
+    'building_density': 0.5,
+    'terrain_mix': (0.7, 0.2, 0.1),
+    'num_dynamic_obstacles': 0
+}
+
+OBSTACLE_DTYPE = np.dtype([
+    ('row', np.int32), ('col', np.int32), ('vertical', np.bool_),
+    ('interval', np.int32), ('length', np.int32), ('speed', np.int32)
+])
+
+TIMELINE_BYTES = 64 * 1024 * 1024
+TIMELINE_BLOCK = 1 << 20
+
+class NeighborIndex:
+    def __init__(self, grid, terrain_costs):
+        rows, cols = grid.shape
+        n = rows * cols
+        ids = np.arange(n, dtype=np.int32).reshape(rows, cols)
+        open_cells = grid != -1
+        table = np.full((rows, cols, 4), -1, dtype=np.int32)
+        table[:, :-1, 0] = np.where(open_cells[:, :-1] & open_cells[:, 1:], ids[:, 1:], -1)
+        table[:-1, :, 1] = np.where(open_cells[:-1, :] & open_cells[1:, :], ids[1:, :], -1)
+        table[:, 1:, 2] = np.where(open_cells[:, 1:] & open_cells[:, :-1], ids[:, :-1], -1)
+        table[1:, :, 3] = np.where(open_cells[1:, :] & open_cells[:-1, :], ids[:-1, :], -1)
+        table = table.reshape(n, 4)
+        has_edge = table >= 0
+        edge_ids = np.full((n, 4), -1, dtype=np.int32)
+        edge_ids[has_edge] = np.arange(int(has_edge.sum()), dtype=np.int32)
+        self.offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(has_edge.sum(axis=1), out=self.offsets[1:])
+        self.targets = table[has_edge]
+        directions = np.nonzero(has_edge)[1]
+        self.reverse = edge_ids[self.targets, (directions + 2) % 4]
+        self.costs = terrain_costs.ravel().astype(np.float32)
+        self.passable = (grid >= 0).ravel()
+        self.weights = self.costs[self.targets]
+        self.weights[~self.passable[self.targets]] = np.inf
+    
+    @classmethod
+    def from_arrays(cls, offsets, targets, reverse, costs, passable, weights):
+        index = cls.__new__(cls)
+        index.offsets = offsets
+        index.targets = targets
+        index.reverse = reverse
+        index.costs = costs
+        index.passable = passable
+        index.weights = weights
+        return index
+    
+    def edges_of(self, nodes):
+        starts = self.offsets[nodes]
+        counts = self.offsets[nodes + 1] - starts
+        edges = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+        return edges, counts
+    
+    def set_passable(self, cells, passable):
+        cells = np.asarray(cells, dtype=np.int64)
+        if cells.size == 0:
+            return
+        self.passable[cells] = passable
+        edges, _ = self.edges_of(cells)
+        incoming = self.reverse[edges]
+        self.weights[incoming] = self.costs[self.targets[incoming]] if passable else np.inf
+
+class OccupancyTimeline:
+    def __init__(self, city_grid, period, max_bytes=TIMELINE_BYTES):
+        self.period = period
+        self.n = city_grid.size * city_grid.size
+        table = city_grid.obstacle_table
+        cells_bytes = 4 * period * int(table['length'].sum()) + 4 * (period + 1)
+        bitset_bytes = period * ((self.n + 7) // 8)
+        self.encoding = 'cells' if cells_bytes <= bitset_bytes else 'bitset'
+        if min(cells_bytes, bitset_bytes) > max_bytes:
+            raise MemoryError(f"occupancy timeline needs {min(cells_bytes, bitset_bytes)} bytes, budget is {max_bytes}")
+        width = len(table) * int(table['length'].max(initial=0))
+        block = max(1, TIMELINE_BLOCK // max(width, self.n if self.encoding == 'bitset' else 1))
+        chunks = []
+        counts = np.zeros(period, dtype=np.int32)
+        if self.encoding == 'bitset':
+            self.bits = np.zeros((period, (self.n + 7) // 8), dtype=np.uint8)
+        for begin in range(0, period, block):
+            steps = np.arange(begin, min(begin + block, period), dtype=np.int64)
+            cells, keep = city_grid._occupancy(steps)
+            if self.encoding == 'bitset':
+                mask = np.zeros((len(steps), self.n), dtype=bool)
+                mask[np.nonzero(keep)[0], cells[keep]] = True
+                self.bits[begin:begin + len(steps)] = np.packbits(mask, axis=1)
+            else:
+                counts[begin:begin + len(steps)] = keep.sum(axis=1)
+                chunks.append(cells[keep].astype(np.int32))
+        if self.encoding == 'cells':
+            self.offsets = np.zeros(period + 1, dtype=np.int64)
+            np.cumsum(counts, out=self.offsets[1:])
+            self.cells = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32)
+    
+    @property
+    def nbytes(self):
+        if self.encoding == 'bitset':
+            return self.bits.nbytes
+        return self.offsets.nbytes + self.cells.nbytes
+    
+    def at(self, time_step):
+        phase = time_step % self.period
+        if self.encoding == 'bitset':
+            return np.flatnonzero(np.unpackbits(self.bits[phase], count=self.n))
+        return self.cells[self.offsets[phase]:self.offsets[phase + 1]].astype(np.int64)
+
 class CityGrid:
-    def __init__(self, map_type="medium"):
+    def __init__(self, map_type="medium", base_map=None, seed=None, **procedural_options):
+        unknown = set(procedural_options) - set(PROCEDURAL_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown procedural options: {sorted(unknown)}")
         self.map_type = map_type
+        self.base_map = base_map
+        self.seed = seed
+        self.procedural_options = dict(PROCEDURAL_DEFAULTS, **procedural_options)
+        self.random = random
         self.size = self._get_map_size(map_type)
-        self.grid = np.zeros((self.size, self.size))
-        self.terrain_costs = np.ones((self.size, self.size))
+        self.grid = None
+        self.terrain_costs = None
         self.dynamic_obstacles = []
+        self.obstacle_table = np.zeros(0, dtype=OBSTACLE_DTYPE)
+        self.traffic_cells = np.zeros(0, dtype=np.int64)
         self.start_pos = None
         self.goal_pos = None
+        self.generation = 0
+        self._neighbor_index = None
+        self.timeline_bytes = TIMELINE_BYTES
+        self._timeline = None
+        self._timeline_generation = None
         self.generate_city(map_type)
     
+    @classmethod
+    def from_arrays(cls, grid, terrain_costs, dynamic_obstacles=(), start_pos=None, goal_pos=None, copy=True,
+                    neighbor_index=None):
+        base_map = {
+            'grid': grid,
+            'terrain_costs': terrain_costs,
+            'dynamic_obstacles': list(dynamic_obstacles),
+            'start_pos': start_pos,
+            'goal_pos': goal_pos,
+            'copy': copy,
+            'neighbor_index': neighbor_index
+        }
+        return cls("custom", base_map=base_map)
+    
+    @classmethod
+    def load(cls, path, verify=False, neighbor_index=None):
+        return cls("file", base_map={'path': path, 'verify': verify, 'neighbor_index': neighbor_index})
+    
+    @property
+    def map_path(self):
+        return self.base_map['path'] if self.map_type == "file" else None
+    
+    def save(self, path):
+        static_grid = np.where(self.grid == -2, 0, self.grid)
+        obstacles = np.stack([self.obstacle_table[field] for field in OBSTACLE_DTYPE.names], axis=1)
+        map_io.write_map(path, static_grid, self.terrain_costs, obstacles, self.start_pos, self.goal_pos)
+    
     def _get_map_size(self, map_type):
+        if map_type == "custom":
+            return self.base_map['grid'].shape[0]
+        if map_type == "file":
+            return map_io.read_header(self.base_map['path'])['size']
+        if map_type == "procedural":
+            return self.procedural_options['size']
         sizes = {
             "small": 10,
             "medium": 15,
@@ -23,16 +183,32 @@ class CityGrid:
         return sizes.get(map_type, 15)
     
     def generate_city(self, map_type=None):
+        if self.grid is not None and self.traffic_cells.size:
+            self.grid.flat[self.traffic_cells] = 0
+            self.traffic_cells = np.zeros(0, dtype=np.int64)
         if map_type:
             self.map_type = map_type
             self.size = self._get_map_size(map_type)
-            self.grid = np.zeros((self.size, self.size))
-            self.terrain_costs = np.ones((self.size, self.size))
+            if map_type not in ("custom", "file"):
+                self.grid = np.zeros((self.size, self.size), dtype=np.int8)
+                self.terrain_costs = np.ones((self.size, self.size), dtype=np.float32)
             self.dynamic_obstacles = []
         
+        self.dynamic_obstacles = []
+        self.generation += 1
+        self._neighbor_index = None
+        if self.seed is not None:
+            self.random = random.Random(self.seed)
+        
+        if self.map_type == "custom":
+            self._load_base_map()
+            return
+        if self.map_type == "file":
+            self._load_map_file()
+            return
+        
         self.grid.fill(0)
         self.terrain_costs.fill(1)
-        self.dynamic_obstacles = []
         
         if self.map_type == "small":
             self._generate_small_map()
@@ -42,9 +218,51 @@ class CityGrid:
             self._generate_large_map()
         elif self.map_type == "dynamic":
             self._generate_dynamic_map()
+        elif self.map_type == "procedural":
+            self._generate_procedural_map()
         
+        self.obstacle_table = self._build_obstacle_table(self.dynamic_obstacles)
+        self.traffic_cells = np.zeros(0, dtype=np.int64)
         self._set_delivery_points()
     
+    def _load_base_map(self):
+        base_map = self.base_map
+        self.grid = np.array(base_map['grid']) if base_map.get('copy', True) else base_map['grid']
+        self._neighbor_index = base_map.pop('neighbor_index', None)
+        self.terrain_costs = base_map['terrain_costs']
+        self.dynamic_obstacles = list(base_map['dynamic_obstacles'])
+        self.obstacle_table = self._build_obstacle_table(self.dynamic_obstacles)
+        self.traffic_cells = np.zeros(0, dtype=np.int64)
+        if base_map['start_pos'] is None or base_map['goal_pos'] is None:
+            self._set_delivery_points()
+        else:
+            self.start_pos = tuple(base_map['start_pos'])
+            self.goal_pos = tuple(base_map['goal_pos'])
+    
+    def _load_map_file(self):
+        data = map_io.read_map(self.base_map['path'], verify=self.base_map['verify'])
+        self._neighbor_index = self.base_map.pop('neighbor_index', None)
+        self.size = data['size']
+        self.grid = data['grid']
+        self.terrain_costs = data['terrain_costs']
+        self.dynamic_obstacles = [
+            (row, col, 'vertical' if vertical else 'horizontal', interval, length, speed)
+            for row, col, vertical, interval, length, speed in data['obstacles'].tolist()
+        ]
+        self.obstacle_table = self._build_obstacle_table(self.dynamic_obstacles)
+        self.traffic_cells = np.zeros(0, dtype=np.int64)
+        if data['start_pos'] is None or data['goal_pos'] is None:
+            self._set_delivery_points()
+        else:
+            self.start_pos = data['start_pos']
+            self.goal_pos = data['goal_pos']
+    
+    def _build_obstacle_table(self, obstacles):
+        table = np.zeros(len(obstacles), dtype=OBSTACLE_DTYPE)
+        for i, (row, col, pattern, interval, length, speed) in enumerate(obstacles):
+            table[i] = (row, col, pattern == 'vertical', interval, length, speed)
+        return table
+    
     def _generate_small_map(self):
         for i in range(0, self.size, 3):
             self.grid[i, :] = 0
@@ -131,6 +349,38 @@ class CityGrid:
         self.grid[6:9, 6:9] = 0
         self.grid[1:4, 10:13] = 0
     
+    def _generate_procedural_map(self):
+        options = self.procedural_options
+        rng = np.random.default_rng(self.seed)
+        size = self.size
+        block = options['block_size']
+        blocks = -(-size // block)
+        road_lines = np.arange(size) % block == 0
+        roads = road_lines[:, None] | road_lines[None, :]
+        
+        buildings = rng.random((blocks, blocks)) < options['building_density']
+        terrain = np.array([1, 2, 3], dtype=np.float32)[rng.choice(3, size=(blocks, blocks), p=options['terrain_mix'])]
+        terrain[buildings] = 1
+        
+        building_cells = np.repeat(np.repeat(buildings, block, axis=0), block, axis=1)[:size, :size]
+        self.grid[building_cells & ~roads] = -1
+        self.terrain_costs[:] = np.repeat(np.repeat(terrain, block, axis=0), block, axis=1)[:size, :size]
+        self.terrain_costs[roads] = 1
+        
+        count = options['num_dynamic_obstacles']
+        if count:
+            road_indices = np.arange(0, size, block)
+            vertical = rng.random(count) < 0.5
+            lanes = rng.choice(road_indices, size=count)
+            intervals = rng.integers(1, 4, size=count)
+            lengths = rng.integers(1, 6, size=count)
+            speeds = rng.integers(1, 3, size=count)
+            self.dynamic_obstacles = [
+                (0, int(lane), 'vertical', int(interval), int(length), int(speed)) if is_vertical
+                else (int(lane), 0, 'horizontal', int(interval), int(length), int(speed))
+                for is_vertical, lane, interval, length, speed in zip(vertical, lanes, intervals, lengths, speeds)
+            ]
+    
     def _set_delivery_points(self):
         self.start_pos = self._find_empty_location()
         min_distance = self.size // 3
@@ -139,7 +389,7 @@ class CityGrid:
     def _find_empty_location(self, far_from=None, min_distance=0):
         max_attempts = 100
         for _ in range(max_attempts):
-            x, y = random.randint(1, self.size-2), random.randint(1, self.size-2)
+            x, y = self.random.randint(1, self.size-2), self.random.randint(1, self.size-2)
             if self.grid[x, y] == 0:
                 if far_from:
                     distance = manhattan_distance((x, y), far_from)
@@ -147,33 +397,97 @@ class CityGrid:
                         return (x, y)
                 else:
                     return (x, y)
-        for x in range(self.size):
-            for y in range(self.size):
-                if self.grid[x, y] == 0:
-                    return (x, y)
+        empty = np.flatnonzero(self.grid == 0)
+        if empty.size:
+            return divmod(int(empty[0]), self.size)
         return (1, 1)
     
+    @property
+    def neighbor_index(self):
+        if self._neighbor_index is None:
+            self._neighbor_index = NeighborIndex(self.grid, self.terrain_costs)
+        return self._neighbor_index
+    
+    @property
+    def traffic_period(self):
+        table = self.obstacle_table
+        if len(table) == 0:
+            return 1
+        lanes = self.size - 2
+        periods = table['interval'].astype(np.int64) * (lanes // np.gcd(table['speed'].astype(np.int64), lanes))
+        return reduce(lambda a, b: a * b // gcd(a, b), periods.tolist(), 1)
+    
+    @property
+    def timeline(self):
+        if self._timeline_generation != self.generation:
+            self._timeline_generation = self.generation
+            try:
+                self._timeline = OccupancyTimeline(self, self.traffic_period, self.timeline_bytes)
+            except MemoryError:
+                self._timeline = None
+        return self._timeline
+    
+    def timeline_stats(self):
+        timeline = self.timeline
+        return {
+            'period': self.traffic_period,
+            'precomputed': timeline is not None,
+            'encoding': timeline.encoding if timeline is not None else None,
+            'bytes': timeline.nbytes if timeline is not None else 0,
+            'max_bytes': self.timeline_bytes
+        }
+    
+    def traffic_phase(self, time_step):
+        timeline = self.timeline
+        return time_step % timeline.period if timeline is not None else time_step
+    
+    def _occupancy(self, steps):
+        table = self.obstacle_table
+        n = self.size * self.size
+        step = (steps[:, None] // table['interval']) * table['speed']
+        base = 1 + step % (self.size - 2)
+        offsets = np.arange(table['length'].max(initial=0))
+        positions = (base[:, :, None] + offsets) % (self.size - 1)
+        vertical = table['vertical'][:, None]
+        rows = np.where(vertical, positions, table['row'][:, None])
+        cols = np.where(vertical, table['col'][:, None], positions)
+        cells = rows.astype(np.int64) * self.size + cols
+        valid = (offsets < table['length'][:, None]) & (self.grid.flat[cells] != -1)
+        cells = np.where(valid, cells, n).reshape(len(steps), -1)
+        cells.sort(axis=1)
+        keep = cells < n
+        keep[:, 1:] &= cells[:, 1:] != cells[:, :-1]
+        return cells, keep
+    
+    def traffic_at(self, time_step):
+        if len(self.obstacle_table) == 0:
+            return np.zeros(0, dtype=np.int64)
+        timeline = self.timeline
+        if timeline is not None:
+            return timeline.at(time_step)
+        cells, keep = self._occupancy(np.array([time_step], dtype=np.int64))
+        return cells[keep]
+    
     def update_dynamic_obstacles(self, time_step):
-        self.grid[self.grid == -2] = 0
-        if not self.dynamic_obstacles:
-            return
-        for obstacle in self.dynamic_obstacles:
-            pattern, interval, length, speed = obstacle[2], obstacle[3], obstacle[4], obstacle[5]
-            step = (time_step // interval) * speed
-            if pattern == 'horizontal':
-                base_x = obstacle[0]
-                base_y = 1 + (step % (self.size - 2))
-                for i in range(length):
-                    y_pos = (base_y + i) % (self.size - 1)
-                    if y_pos < self.size and self.grid[base_x, y_pos] == 0:
-                        self.grid[base_x, y_pos] = -2
-            else:
-                base_x = 1 + (step % (self.size - 2))
-                base_y = obstacle[1]
-                for i in range(length):
-                    x_pos = (base_x + i) % (self.size - 1)
-                    if x_pos < self.size and self.grid[x_pos, base_y] == 0:
-                        self.grid[x_pos, base_y] = -2
+        occupied = self.traffic_at(time_step)
+        cleared = np.setdiff1d(self.traffic_cells, occupied, assume_unique=True)
+        added = np.setdiff1d(occupied, self.traffic_cells, assume_unique=True)
+        self.grid.flat[cleared] = 0
+        self.grid.flat[added] = -2
+        if self._neighbor_index is not None:
+            self._neighbor_index.set_passable(cleared, True)
+            self._neighbor_index.set_passable(added, False)
+        self.traffic_cells = occupied
+        return np.union1d(cleared, added)
+    
+    @property
+    def grid_version(self):
+        return (self.generation, hash(self.traffic_cells.tobytes()))
+    
+    def changed_cells(self, generation, traffic_cells):
+        if generation != self.generation:
+            return None
+        return np.setxor1d(traffic_cells, self.traffic_cells, assume_unique=True)
     
     def get_grid_info(self):
         return {
@@ -0,0 +1,213 @@
+import heapq
+import time
+from pathfinding import PathfindingResult, DEADLINE_CHECK
+from utils import calculate_path_cost
+
+WINDOW = 16
+BUDGET_MS = 50
+
+class Agent:
+    def __init__(self, agent_id, position, goal, cell, time_step):
+        self.agent_id = agent_id
+        self.position = position
+        self.goal = goal
+        self.trail = [position]
+        self.arrived = position == goal
+        self.plan = [cell]
+        self.plan_start = time_step
+        self.keys = []
+    
+    @property
+    def plan_end(self):
+        return self.plan_start + len(self.plan) - 1
+
+class CooperativePlanner:
+    def __init__(self, city_grid, pathfinder, window=WINDOW, budget_ms=BUDGET_MS):
+        self.city_grid = city_grid
+        self.pathfinder = pathfinder
+        self.window = window
+        self.budget_ms = budget_ms
+        self.agents = []
+        self.reserved = {}
+        self.moves = {}
+        self.parked = {}
+        self.occupied = {}
+        self.goal_fields = {}
+        self.goal_fields_generation = city_grid.generation
+        self.time_step = 0
+        self.last_planned = 0
+        self.last_deferred = 0
+        self.last_bookkeeping = 0.0
+    
+    def add_agent(self, position, goal, time_step=None):
+        position, goal = tuple(position), tuple(goal)
+        grid = self.city_grid.grid
+        if grid[position] < 0 or grid[goal] == -1:
+            raise ValueError(f"agent route {position} -> {goal} starts or ends on a blocked cell")
+        cell = position[0] * self.city_grid.size + position[1]
+        if cell in self.parked or cell in self.occupied:
+            raise ValueError(f"another agent already occupies {position}")
+        agent = Agent(len(self.agents), position, goal, cell, self.time_step if time_step is None else time_step)
+        self.agents.append(agent)
+        if not agent.arrived:
+            self.parked[cell] = (agent.agent_id, agent.plan_start)
+            self.occupied[cell] = agent.agent_id
+        return agent
+    
+    @property
+    def active_agents(self):
+        return [agent for agent in self.agents if not agent.arrived]
+    
+    def _goal_field(self, goal):
+        if self.goal_fields_generation != self.city_grid.generation:
+            self.goal_fields.clear()
+            self.goal_fields_generation = self.city_grid.generation
+        field = self.goal_fields.get(goal)
+        if field is None:
+            field = self.goal_fields[goal] = self.pathfinder.landmarks().estimate(goal)
+        return field
+    
+    def _can_park(self, agent_id, cell, arrival, n):
+        owner = self.parked.get(cell)
+        if owner is not None and owner[0] != agent_id:
+            return False
+        reserved = self.reserved
+        for time_step in range(arrival + 1, self.time_step + self.window + 1):
+            if reserved.get(time_step * n + cell, agent_id) != agent_id:
+                return False
+        return True
+    
+    def _plan_window(self, agent, deadline=None):
+        size = self.city_grid.size
+        n = size * size
+        index = self.city_grid.neighbor_index
+        offsets = memoryview(index.offsets)
+        targets = memoryview(index.targets)
+        costs = memoryview(index.costs)
+        occupied_at = self.pathfinder.occupied_at
+        reserved, moves, parked = self.reserved, self.moves, self.parked
+        remaining = self._goal_field(agent.goal)
+        now = self.time_step
+        horizon = now + self.window
+        agent_id = agent.agent_id
+        source = now * n + agent.position[0] * size + agent.position[1]
+        target = agent.goal[0] * size + agent.goal[1]
+        if remaining(source % n) == float("inf"):
+            return None, 0
+        g = {source: 0.0}
+        parent = {source: -1}
+        closed = set()
+        heap = [(remaining(source % n), source)]
+        nodes_expanded = 0
+        while heap:
+            _, state = heapq.heappop(heap)
+            if state in closed:
+                continue
+            closed.add(state)
+            nodes_expanded += 1
+            if deadline is not None and not nodes_expanded % DEADLINE_CHECK and time.perf_counter() > deadline:
+                return None, nodes_expanded
+            time_step, cell = divmod(state, n)
+            if cell == target or time_step == horizon:
+                if cell != target and not self._can_park(agent_id, cell, time_step, n):
+                    continue
+                cells = []
+                while state != -1:
+                    cells.append(state % n)
+                    state = parent[state]
+                cells.reverse()
+                return cells, nodes_expanded
+            layer = (time_step + 1) * n
+            blocked = occupied_at(time_step + 1)
+            neighbors = [targets[edge] for edge in range(offsets[cell], offsets[cell + 1])]
+            neighbors.append(cell)
+            for neighbor in neighbors:
+                if neighbor in blocked or reserved.get(layer + neighbor, agent_id) != agent_id:
+                    continue
+                owner = parked.get(neighbor)
+                if owner is not None and owner[0] != agent_id and owner[1] <= time_step + 1:
+                    continue
+                if neighbor != cell and moves.get((layer + cell) * n + neighbor, agent_id) != agent_id:
+                    continue
+                successor = layer + neighbor
+                new_g = g[state] + costs[neighbor]
+                if successor not in closed and new_g < g.get(successor, float("inf")):
+                    g[successor] = new_g
+                    parent[successor] = state
+                    heapq.heappush(heap, (new_g + remaining(neighbor), successor))
+        return None, nodes_expanded
+    
+    def _release(self, agent):
+        for key in agent.keys:
+            self.reserved.pop(key, None)
+            self.moves.pop(key, None)
+        agent.keys = []
+        cell = agent.plan[-1]
+        if self.parked.get(cell, (None,))[0] == agent.agent_id:
+            del self.parked[cell]
+    
+    def _commit(self, agent, cells):
+        self._release(agent)
+        n = self.city_grid.size ** 2
+        now = self.time_step
+        for offset, cell in enumerate(cells):
+            key = (now + offset) * n + cell
+            self.reserved[key] = agent.agent_id
+            agent.keys.append(key)
+            if offset and cells[offset - 1] != cell:
+                move = key * n + cells[offset - 1]
+                self.moves[move] = agent.agent_id
+                agent.keys.append(move)
+        agent.plan = cells
+        agent.plan_start = now
+        if cells[-1] != agent.goal[0] * self.city_grid.size + agent.goal[1]:
+            self.parked[cells[-1]] = (agent.agent_id, now + len(cells) - 1)
+    
+    def step(self, time_step):
+        size = self.city_grid.size
+        self.time_step = time_step
+        deadline = time.perf_counter() + self.budget_ms / 1000.0 - self.last_bookkeeping
+        agents = self.active_agents
+        threshold = time_step + self.window // 2
+        goal_cells = {agent.agent_id: agent.goal[0] * size + agent.goal[1] for agent in agents}
+        due = [agent for agent in agents if agent.plan_end <= threshold and agent.plan[-1] != goal_cells[agent.agent_id]]
+        due.sort(key=lambda agent: agent.plan_end)
+        results = {}
+        planned = deferred = 0
+        for agent in due:
+            start_time = time.perf_counter()
+            if start_time > deadline:
+                deferred += 1
+                continue
+            cells, nodes_expanded = self._plan_window(agent, deadline)
+            if cells is None and time.perf_counter() > deadline:
+                deferred += 1
+                continue
+            planned += 1
+            if cells is not None:
+                self._commit(agent, cells)
+            path = [divmod(cell, size) for cell in cells] if cells else None
+            results[agent.agent_id] = PathfindingResult("WHCA*", path, nodes_expanded, time.perf_counter() - start_time,
+                                                        calculate_path_cost(path, self.city_grid.terrain_costs) if path else 0)
+        moved = time.perf_counter()
+        occupied = self.occupied
+        for agent in agents:
+            offset = time_step + 1 - agent.plan_start
+            cell = agent.position[0] * size + agent.position[1]
+            if offset < len(agent.plan) and agent.plan[offset] != cell:
+                if occupied.get(cell) == agent.agent_id:
+                    del occupied[cell]
+                cell = agent.plan[offset]
+                occupied[cell] = agent.agent_id
+                agent.position = divmod(cell, size)
+            agent.trail.append(agent.position)
+            if agent.position == agent.goal:
+                agent.arrived = True
+                if occupied.get(cell) == agent.agent_id:
+                    del occupied[cell]
+                self._release(agent)
+        self.time_step = time_step + 1
+        self.last_bookkeeping = time.perf_counter() - moved
+        self.last_planned = planned
+        self.last_deferred = deferred
+        return results
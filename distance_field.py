@@ -0,0 +1,172 @@
+import heapq
+import numpy as np
+
+FIELD_BATCH_BYTES = 256 * 1024 * 1024
+
+class DistanceField:
+    def __init__(self, source, distances, parents, size, nodes_expanded=0):
+        self.source = source
+        self.distances = distances
+        self.parents = parents
+        self.size = size
+        self.nodes_expanded = nodes_expanded
+    
+    def cost_to(self, goal):
+        return float(self.distances[goal[0] * self.size + goal[1]])
+    
+    def path_to(self, goal):
+        node = goal[0] * self.size + goal[1]
+        if not np.isfinite(self.distances[node]):
+            return None
+        parents = self.parents
+        nodes = []
+        while node != -1:
+            nodes.append(node)
+            node = int(parents[node])
+        return [divmod(node, self.size) for node in reversed(nodes)]
+
+def compute_distance_field(city_grid, source, ignore_traffic=False, stop_at=None):
+    index = city_grid.neighbor_index
+    node = source[0] * city_grid.size + source[1]
+    costs = index.costs
+    weights = costs[index.targets] if ignore_traffic else index.weights
+    wanted = None
+    if stop_at is not None:
+        wanted = np.zeros(len(costs), dtype=bool)
+        wanted[[row * city_grid.size + col for row, col in stop_at]] = True
+    if np.all(costs == np.floor(costs)) and costs.min() >= 1:
+        distances, parents, nodes_expanded = _wavefront(index, node, weights, wanted)
+    else:
+        distances, parents, nodes_expanded = _dijkstra(index, node, weights, wanted)
+    return DistanceField(source, distances, parents, city_grid.size, nodes_expanded)
+
+def _wavefront(index, source, weights, wanted=None):
+    n = len(index.passable)
+    distances = np.full(n, np.inf)
+    parents = np.full(n, -1, dtype=np.int32)
+    settled = np.zeros(n, dtype=bool)
+    distances[source] = 0.0
+    buckets = {0.0: [np.array([source], dtype=np.int64)]}
+    nodes_expanded = 0
+    left = -1 if wanted is None else int(wanted.sum())
+    while buckets and left != 0:
+        distance = min(buckets)
+        nodes = np.unique(np.concatenate(buckets.pop(distance)))
+        nodes = nodes[(distances[nodes] == distance) & ~settled[nodes]]
+        if nodes.size == 0:
+            continue
+        settled[nodes] = True
+        nodes_expanded += nodes.size
+        if wanted is not None:
+            left -= int(wanted[nodes].sum())
+        edges, counts = index.edges_of(nodes)
+        sources = np.repeat(nodes, counts)
+        targets = index.targets[edges]
+        candidates = distance + weights[edges]
+        improved = candidates < distances[targets]
+        sources, targets, candidates = sources[improved], targets[improved], candidates[improved]
+        if targets.size == 0:
+            continue
+        order = np.argsort(candidates, kind='stable')[::-1]
+        distances[targets[order]] = candidates[order]
+        parents[targets[order]] = sources[order]
+        for value in np.unique(candidates):
+            buckets.setdefault(float(value), []).append(targets[candidates == value])
+    return distances, parents, nodes_expanded
+
+def _dijkstra(index, source, weights, wanted=None):
+    n = len(index.passable)
+    distances = np.full(n, np.inf)
+    parents = np.full(n, -1, dtype=np.int32)
+    dist = memoryview(distances)
+    came_from = memoryview(parents)
+    offsets = memoryview(index.offsets)
+    targets = memoryview(index.targets)
+    weights = memoryview(weights)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    nodes_expanded = 0
+    left = -1 if wanted is None else int(wanted.sum())
+    while heap and left != 0:
+        distance, node = heapq.heappop(heap)
+        if distance > dist[node]:
+            continue
+        nodes_expanded += 1
+        if wanted is not None and wanted[node]:
+            wanted[node] = False
+            left -= 1
+        for edge in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[edge]
+            candidate = distance + weights[edge]
+            if candidate < dist[neighbor]:
+                dist[neighbor] = candidate
+                came_from[neighbor] = node
+                heapq.heappush(heap, (candidate, neighbor))
+    return distances, parents, nodes_expanded
+
+def distance_matrix(city_grid, sources, targets, nearest=None, batch_bytes=FIELD_BATCH_BYTES):
+    index = city_grid.neighbor_index
+    size = city_grid.size
+    n = size * size
+    source_cells = np.array([row * size + col for row, col in sources], dtype=np.int64)
+    target_cells = np.array([row * size + col for row, col in targets], dtype=np.int64)
+    matrix = np.full((len(source_cells), len(target_cells)), np.inf)
+    costs = index.costs
+    if not (np.all(costs == np.floor(costs)) and costs.min() >= 1):
+        wanted = np.zeros(n, dtype=bool)
+        for i, source in enumerate(source_cells):
+            wanted[target_cells] = True
+            distances, _, _ = _dijkstra(index, int(source), index.weights, wanted)
+            matrix[i] = distances[target_cells]
+        return matrix, 0
+    batch = max(1, batch_bytes // (n * 5))
+    nodes_expanded = 0
+    for first in range(0, len(source_cells), batch):
+        chunk = source_cells[first:first + batch]
+        distances, expanded = _batched_wavefront(index, chunk, target_cells, n, nearest)
+        matrix[first:first + len(chunk)] = distances.reshape(len(chunk), n)[:, target_cells]
+        nodes_expanded += expanded
+    return matrix, nodes_expanded
+
+def _batched_wavefront(index, sources, targets, n, nearest=None):
+    count = len(sources)
+    distances = np.full(count * n, np.inf, dtype=np.float32)
+    settled = np.zeros(count * n, dtype=bool)
+    wanted = np.zeros(count * n, dtype=bool)
+    wanted[(np.arange(count)[:, None] * n + targets[None, :]).ravel()] = True
+    quota = np.full(count, int(wanted.sum()) // count if nearest is None else nearest, dtype=np.int64)
+    slot = np.zeros(count * n, dtype=np.int64)
+    steps = np.unique(index.costs[np.isfinite(index.costs)])
+    starts = np.arange(count, dtype=np.int64) * n + sources
+    distances[starts] = 0
+    buckets = {0: [starts]}
+    nodes_expanded = 0
+    while buckets:
+        distance = min(buckets)
+        nodes = np.concatenate(buckets.pop(distance))
+        nodes = nodes[(distances[nodes] == distance) & ~settled[nodes] & (quota[nodes // n] > 0)]
+        slot[nodes] = np.arange(nodes.size)
+        nodes = nodes[slot[nodes] == np.arange(nodes.size)]
+        if nodes.size == 0:
+            continue
+        settled[nodes] = True
+        nodes_expanded += nodes.size
+        layers, cells = np.divmod(nodes, n)
+        quota -= np.bincount(layers[wanted[nodes]], minlength=count)
+        if not np.any(quota > 0):
+            break
+        edges, counts = index.edges_of(cells)
+        neighbors = index.targets[edges] + np.repeat(layers * n, counts)
+        weights = index.weights[edges]
+        candidates = distance + weights
+        improved = candidates < distances[neighbors]
+        neighbors, candidates, weights = neighbors[improved], candidates[improved], weights[improved]
+        if neighbors.size == 0:
+            continue
+        np.minimum.at(distances, neighbors, candidates)
+        for step in steps:
+            chosen = neighbors[weights == step]
+            if chosen.size:
+                buckets.setdefault(distance + int(step), []).append(chosen)
+    distances[~settled] = np.inf
+    return distances, nodes_expanded
@@ -0,0 +1,173 @@
+import heapq
+import numpy as np
+
+class DStarLite:
+    def __init__(self, city_grid, start, goal):
+        self.city_grid = city_grid
+        self.goal = goal
+        self.start = start
+        self._reset()
+    
+    def _reset(self):
+        grid = self.city_grid
+        self.size = grid.size
+        self.generation = grid.generation
+        self.traffic = grid.traffic_cells.copy()
+        index = grid.neighbor_index
+        self.offsets = memoryview(index.offsets)
+        self.targets = memoryview(index.targets)
+        self.reverse = memoryview(index.reverse)
+        self.weights = memoryview(index.weights)
+        self.costs = memoryview(index.costs)
+        n = self.size * self.size
+        self.g_cost = np.full(n, np.inf)
+        self.rhs_cost = np.full(n, np.inf)
+        self.g = memoryview(self.g_cost)
+        self.rhs = memoryview(self.rhs_cost)
+        self.open = {}
+        self.heap = []
+        self.km = 0.0
+        self.source = self._node(self.start)
+        self.last = self.source
+        self.target = self._node(self.goal)
+        self.rhs[self.target] = 0.0
+        self._push(self.target)
+    
+    def _node(self, position):
+        return position[0] * self.size + position[1]
+    
+    def _heuristic(self, a, b):
+        ax, ay = divmod(a, self.size)
+        bx, by = divmod(b, self.size)
+        return abs(ax - bx) + abs(ay - by)
+    
+    def _key(self, node):
+        m = min(self.g[node], self.rhs[node])
+        return (m + self._heuristic(self.source, node) + self.km, m)
+    
+    def _push(self, node):
+        key = self._key(node)
+        self.open[node] = key
+        heapq.heappush(self.heap, (key, node))
+    
+    def _top(self):
+        heap = self.heap
+        while heap:
+            key, node = heap[0]
+            if self.open.get(node) == key:
+                return key, node
+            heapq.heappop(heap)
+        return None, None
+    
+    def _update_vertex(self, node):
+        if self.g[node] != self.rhs[node]:
+            self._push(node)
+        else:
+            self.open.pop(node, None)
+    
+    def _best_successor(self, node):
+        best_cost = float("inf")
+        best = -1
+        g = self.g
+        weights = self.weights
+        targets = self.targets
+        for edge in range(self.offsets[node], self.offsets[node + 1]):
+            cost = weights[edge] + g[targets[edge]]
+            if cost < best_cost:
+                best_cost = cost
+                best = targets[edge]
+        return best_cost, best
+    
+    def _compute_shortest_path(self):
+        g = self.g
+        rhs = self.rhs
+        offsets = self.offsets
+        targets = self.targets
+        reverse = self.reverse
+        weights = self.weights
+        source = self.source
+        target = self.target
+        nodes_expanded = 0
+        while True:
+            key, node = self._top()
+            if node is None:
+                break
+            if not (key < self._key(source) or rhs[source] > g[source]):
+                break
+            new_key = self._key(node)
+            if key < new_key:
+                self._push(node)
+                continue
+            heapq.heappop(self.heap)
+            del self.open[node]
+            nodes_expanded += 1
+            if g[node] > rhs[node]:
+                g[node] = rhs[node]
+                node_g = g[node]
+                for edge in range(offsets[node], offsets[node + 1]):
+                    pred = targets[edge]
+                    if pred != target:
+                        cost = weights[reverse[edge]] + node_g
+                        if cost < rhs[pred]:
+                            rhs[pred] = cost
+                        self._update_vertex(pred)
+            else:
+                old_g = g[node]
+                g[node] = float("inf")
+                self._update_vertex(node)
+                for edge in range(offsets[node], offsets[node + 1]):
+                    pred = targets[edge]
+                    if pred != target and rhs[pred] == weights[reverse[edge]] + old_g:
+                        rhs[pred] = self._best_successor(pred)[0]
+                    self._update_vertex(pred)
+        return nodes_expanded
+    
+    def _apply_changes(self, changed):
+        g = self.g
+        rhs = self.rhs
+        passable = self.city_grid.neighbor_index.passable
+        for cell in changed.tolist():
+            new_cost = self.costs[cell] if passable[cell] else float("inf")
+            old_cost = float("inf") if passable[cell] else self.costs[cell]
+            cell_g = g[cell]
+            for edge in range(self.offsets[cell], self.offsets[cell + 1]):
+                pred = self.targets[edge]
+                if pred == self.target:
+                    continue
+                if old_cost > new_cost:
+                    if new_cost + cell_g < rhs[pred]:
+                        rhs[pred] = new_cost + cell_g
+                elif rhs[pred] == old_cost + cell_g:
+                    rhs[pred] = self._best_successor(pred)[0]
+                self._update_vertex(pred)
+    
+    def plan(self, start=None):
+        if start is not None and start != self.start:
+            self.start = start
+            self.source = self._node(start)
+            self.km += self._heuristic(self.last, self.source)
+            self.last = self.source
+        changed = self.city_grid.changed_cells(self.generation, self.traffic)
+        if changed is None:
+            self._reset()
+        elif changed.size:
+            self._apply_changes(changed)
+            self.traffic = self.city_grid.traffic_cells.copy()
+        passable = self.city_grid.neighbor_index.passable
+        if not passable[self.source] or not passable[self.target]:
+            return None, 0
+        nodes_expanded = self._compute_shortest_path()
+        return self._extract_path(), nodes_expanded
+    
+    def _extract_path(self):
+        if self.g[self.source] == float("inf") and self.rhs[self.source] == float("inf"):
+            return None
+        node = self.source
+        nodes = [node]
+        limit = self.size * self.size
+        while node != self.target:
+            cost, node = self._best_successor(node)
+            if node == -1 or cost == float("inf") or len(nodes) > limit:
+                return None
+            nodes.append(node)
+        return [divmod(node, self.size) for node in nodes]
@@ -0,0 +1,119 @@
+import heapq
+import numpy as np
+from distance_field import compute_distance_field
+
+MAX_GOAL_TREES = 8
+
+class GoalTree:
+    def __init__(self, city_grid, goal):
+        self.city_grid = city_grid
+        self.goal = tuple(goal)
+        self._build()
+    
+    def _build(self):
+        city = self.city_grid
+        self.size = city.size
+        self.target = self.goal[0] * self.size + self.goal[1]
+        field = compute_distance_field(city, self.goal)
+        self.distances = field.distances
+        self.parents = field.parents
+        self.generation = city.generation
+        self.traffic = city.traffic_cells.copy()
+        self.nodes_expanded = field.nodes_expanded
+        return self.nodes_expanded
+    
+    def sync(self):
+        city = self.city_grid
+        changed = city.changed_cells(self.generation, self.traffic)
+        if changed is None:
+            return self._build()
+        self.traffic = city.traffic_cells.copy()
+        self.nodes_expanded = self._repair(changed) if changed.size else 0
+        return self.nodes_expanded
+    
+    def _subtree(self, roots):
+        index = self.city_grid.neighbor_index
+        parents = self.parents
+        frontier = roots[np.isfinite(self.distances[roots]) & (roots != self.target)]
+        found = [frontier]
+        while frontier.size:
+            edges, counts = index.edges_of(frontier)
+            children = index.targets[edges]
+            frontier = children[parents[children] == np.repeat(frontier, counts)]
+            found.append(frontier)
+        return np.concatenate(found)
+    
+    def _repair(self, changed):
+        index = self.city_grid.neighbor_index
+        distances = self.distances
+        parents = self.parents
+        blocked = changed[~index.passable[changed]]
+        stale = self._subtree(blocked)
+        distances[stale] = np.inf
+        parents[stale] = -1
+        seeds = np.union1d(stale, changed[index.passable[changed]])
+        edges, counts = index.edges_of(seeds)
+        heads = np.repeat(seeds, counts)
+        tails = index.targets[edges]
+        candidates = distances[tails] + index.weights[index.reverse[edges]]
+        better = candidates < distances[heads]
+        heads, tails, candidates = heads[better], tails[better], candidates[better]
+        order = np.argsort(candidates, kind='stable')[::-1]
+        distances[heads[order]] = candidates[order]
+        parents[heads[order]] = tails[order]
+        seeded = np.unique(heads)
+        heap = list(zip(distances[seeded].tolist(), seeded.tolist()))
+        heapq.heapify(heap)
+        dist = memoryview(distances)
+        came_from = memoryview(parents)
+        offsets = memoryview(index.offsets)
+        targets = memoryview(index.targets)
+        weights = memoryview(index.weights)
+        nodes_expanded = 0
+        while heap:
+            distance, node = heapq.heappop(heap)
+            if distance > dist[node]:
+                continue
+            nodes_expanded += 1
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[edge]
+                candidate = distance + weights[edge]
+                if candidate < dist[neighbor]:
+                    dist[neighbor] = candidate
+                    came_from[neighbor] = node
+                    heapq.heappush(heap, (candidate, neighbor))
+        return nodes_expanded
+    
+    def _cell(self, start):
+        row, col = start
+        if not (0 <= row < self.size and 0 <= col < self.size):
+            return -1
+        node = row * self.size + col
+        passable = self.city_grid.neighbor_index.passable
+        if not (passable[node] and passable[self.target] and np.isfinite(self.distances[node])):
+            return -1
+        return node
+    
+    def cost_from(self, start):
+        node = self._cell(start)
+        if node == -1:
+            return float("inf")
+        costs = self.city_grid.neighbor_index.costs
+        return float(self.distances[node] - costs[node] + costs[self.target])
+    
+    def next_hop(self, start):
+        node = self._cell(start)
+        if node == -1 or node == self.target:
+            return None
+        return divmod(int(self.parents[node]), self.size)
+    
+    def path_from(self, start):
+        node = self._cell(start)
+        if node == -1:
+            return None
+        parents = self.parents
+        nodes = []
+        while node != -1:
+            nodes.append(node)
+            node = int(parents[node])
+        return [divmod(node, self.size) for node in nodes]
@@ -0,0 +1,30 @@
+import sys
+from city_grid import CityGrid
+from simulation import Simulation
+from result_log import ResultLog
+
+def iter_results(map_type="medium", algorithm="A*", steps=1, seed=None, size=None, num_dynamic_obstacles=None, landmark_dir=None,
+                 map_file=None, save_map=None, metrics=False, profile=None):
+    options = {}
+    if size is not None:
+        options['size'] = size
+    if num_dynamic_obstacles is not None:
+        options['num_dynamic_obstacles'] = num_dynamic_obstacles
+    city = CityGrid.load(map_file) if map_file else CityGrid(map_type, seed=seed, **options)
+    if save_map:
+        city.save(save_map)
+    simulation = Simulation(city, landmark_dir=landmark_dir)
+    if not simulation.set_algorithm(algorithm):
+        raise ValueError(f"Unknown algorithm: {algorithm}")
+    if metrics or profile:
+        simulation.enable_instrumentation(profile)
+    for _ in range(steps):
+        yield simulation.time_step, simulation.run_pathfinding()
+        simulation.next_time_step()
+
+def run_headless(output=None, include_path=False, **options):
+    log = ResultLog(output or sys.stdout, include_path)
+    for time_step, result in iter_results(**options):
+        log.write(result, time_step=time_step)
+    log.close()
+    return log.count
@@ -0,0 +1,320 @@
+import heapq
+import numpy as np
+from utils import is_valid_position
+
+CLUSTER_SIZE = 16
+SPLIT_LENGTH = 6
+RELAX_BATCH = 256
+
+def _entrances(open_cells, cluster_size):
+    lines, length = open_cells.shape
+    per_line = -(-length // cluster_size)
+    segments = np.zeros((lines, per_line * cluster_size), dtype=bool)
+    segments[:, :length] = open_cells
+    segments = segments.reshape(lines * per_line, cluster_size)
+    edges = np.diff(np.pad(segments, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    segment, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1]
+    run = ends - starts
+    wide = run >= SPLIT_LENGTH
+    positions = np.concatenate([np.where(wide, starts, starts + (run - 1) // 2), ends[wide] - 1])
+    segment = np.concatenate([segment, segment[wide]])
+    line = segment // per_line
+    offset = (segment % per_line) * cluster_size + positions
+    order = np.lexsort((offset, line))
+    line, offset = line[order], offset[order]
+    return offset, np.searchsorted(line, np.arange(lines + 1))
+
+def _relax(distances, costs):
+    width = distances.shape[-1]
+    forward, backward = range(1, width), range(width - 2, -1, -1)
+    active = np.arange(len(distances))
+    while active.size:
+        current = distances[active]
+        step = costs[active]
+        previous = current.copy()
+        for i in forward:
+            np.minimum(current[..., i, :], current[..., i - 1, :] + step[..., i, :], out=current[..., i, :])
+        for i in backward:
+            np.minimum(current[..., i, :], current[..., i + 1, :] + step[..., i, :], out=current[..., i, :])
+        for i in forward:
+            np.minimum(current[..., i], current[..., i - 1] + step[..., i], out=current[..., i])
+        for i in backward:
+            np.minimum(current[..., i], current[..., i + 1] + step[..., i], out=current[..., i])
+        moved = (current < previous).reshape(len(active), -1).any(axis=1)
+        distances[active] = current
+        active = active[moved]
+
+class HierarchicalRoute:
+    def __init__(self, planner, waypoints, cost):
+        self.planner = planner
+        self.waypoints = waypoints
+        self.cost = cost
+        self.cells = [waypoints[0]]
+        self.legs_refined = 0
+    
+    @property
+    def complete(self):
+        return self.legs_refined == len(self.waypoints) - 1
+    
+    def _extend(self, count):
+        while len(self.cells) < count and not self.complete:
+            leg = self.legs_refined
+            self.cells.extend(self.planner.refine_leg(self.waypoints[leg], self.waypoints[leg + 1]))
+            self.legs_refined += 1
+    
+    def refine(self, count):
+        self._extend(count)
+        return self._positions(self.cells[:count])
+    
+    def __iter__(self):
+        position = 0
+        while True:
+            if position == len(self.cells):
+                if self.complete:
+                    return
+                self._extend(position + 1)
+            yield divmod(self.cells[position], self.planner.size)
+            position += 1
+    
+    def path(self):
+        self._extend(float("inf"))
+        return self._positions(self.cells)
+    
+    def _positions(self, cells):
+        size = self.planner.size
+        return [divmod(cell, size) for cell in cells]
+
+class HierarchicalPlanner:
+    def __init__(self, city_grid, cluster_size=CLUSTER_SIZE):
+        self.city_grid = city_grid
+        self.cluster_size = cluster_size
+        self.generation = None
+        self.traffic = None
+        self.clusters_recomputed = 0
+    
+    def sync(self):
+        city = self.city_grid
+        changed = None if self.generation is None else city.changed_cells(self.generation, self.traffic)
+        if changed is None:
+            self._build()
+        elif changed.size:
+            self._update(changed)
+        self.generation = city.generation
+        self.traffic = city.traffic_cells.copy()
+    
+    def _build(self):
+        city = self.city_grid
+        index = city.neighbor_index
+        size = self.size = city.size
+        side = self.per_side = -(-size // self.cluster_size)
+        self.passable = memoryview(index.passable)
+        self.costs = memoryview(index.costs)
+        padded = side * self.cluster_size
+        self.tiles = np.full((padded, padded), np.inf, dtype=np.float32)
+        self.tiles[:size, :size] = np.where(index.passable, index.costs, np.inf).reshape(size, size)
+        self.vertical = [np.empty(0, dtype=np.int64)] * (side - 1)
+        self.horizontal = [np.empty(0, dtype=np.int64)] * (side - 1)
+        self.links = {}
+        self.cluster_nodes = [np.empty(0, dtype=np.int64)] * (side * side)
+        self.cluster_costs = [[] for _ in range(side * side)]
+        self.node_slot = {}
+        lines = np.arange(side - 1)
+        self._scan_lines(lines, lines)
+        clusters = np.arange(side * side)
+        self._refresh_clusters(clusters, clusters)
+    
+    def _update(self, changed):
+        index = self.city_grid.neighbor_index
+        rows, cols = np.divmod(changed, self.size)
+        self.tiles[rows, cols] = np.where(index.passable[changed], index.costs[changed], np.inf)
+        cluster_rows, cluster_cols = rows // self.cluster_size, cols // self.cluster_size
+        vertical = np.unique(np.concatenate([cluster_cols - 1, cluster_cols]))
+        horizontal = np.unique(np.concatenate([cluster_rows - 1, cluster_rows]))
+        lines = self.per_side - 1
+        self._scan_lines(vertical[(vertical >= 0) & (vertical < lines)], horizontal[(horizontal >= 0) & (horizontal < lines)])
+        side = self.per_side
+        touched = np.unique(cluster_rows * side + cluster_cols)
+        rows, cols = np.divmod(touched, side)
+        rows = np.concatenate([rows, rows - 1, rows + 1, rows, rows])
+        cols = np.concatenate([cols, cols, cols, cols - 1, cols + 1])
+        inside = (rows >= 0) & (rows < side) & (cols >= 0) & (cols < side)
+        self._refresh_clusters(touched, np.unique(rows[inside] * side + cols[inside]))
+    
+    def _scan_lines(self, vertical, horizontal):
+        size = self.size
+        passable = np.asarray(self.passable).reshape(size, size)
+        cols = (vertical + 1) * self.cluster_size - 1
+        offsets, bounds = _entrances((passable[:, cols] & passable[:, cols + 1]).T, self.cluster_size)
+        for i, line in enumerate(vertical):
+            cells = offsets[bounds[i]:bounds[i + 1]] * size + cols[i]
+            self.vertical[line] = self._relink(self.vertical[line], cells, 1)
+        rows = (horizontal + 1) * self.cluster_size - 1
+        offsets, bounds = _entrances(passable[rows] & passable[rows + 1], self.cluster_size)
+        for i, line in enumerate(horizontal):
+            cells = rows[i] * size + offsets[bounds[i]:bounds[i + 1]]
+            self.horizontal[line] = self._relink(self.horizontal[line], cells, size)
+    
+    def _relink(self, old, new, step):
+        links = self.links
+        for cell in np.setdiff1d(old, new, assume_unique=True).tolist():
+            for a, b in ((cell, cell + step), (cell + step, cell)):
+                del links[a][b]
+                if not links[a]:
+                    del links[a]
+        for cell in np.setdiff1d(new, old, assume_unique=True).tolist():
+            for a, b in ((cell, cell + step), (cell + step, cell)):
+                links.setdefault(a, {})[b] = float(self.costs[b])
+        return new
+    
+    def cluster_of(self, cell):
+        row, col = divmod(cell, self.size)
+        return row // self.cluster_size * self.per_side + col // self.cluster_size
+    
+    def _nodes_of(self, cluster):
+        size, side, k = self.size, self.per_side, self.cluster_size
+        row, col = divmod(cluster, side)
+        top, left = row * k, col * k
+        parts = []
+        for line, shift in ((col - 1, 1), (col, 0)):
+            if 0 <= line < side - 1:
+                cells = self.vertical[line] + shift
+                parts.append(cells[(cells >= top * size) & (cells < (top + k) * size)])
+        for line, shift in ((row - 1, size), (row, 0)):
+            if 0 <= line < side - 1:
+                cells = self.horizontal[line] + shift
+                parts.append(cells[(cells % size >= left) & (cells % size < left + k)])
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+    
+    def _refresh_clusters(self, touched, candidates):
+        size, side, k = self.size, self.per_side, self.cluster_size
+        touched = set(touched.tolist())
+        stale = []
+        for cluster in candidates.tolist():
+            nodes = self._nodes_of(cluster)
+            if cluster in touched or not np.array_equal(nodes, self.cluster_nodes[cluster]):
+                for cell in self.cluster_nodes[cluster].tolist():
+                    del self.node_slot[cell]
+                for slot, cell in enumerate(nodes.tolist()):
+                    self.node_slot[cell] = (cluster, slot)
+                self.cluster_nodes[cluster] = nodes
+                stale.append(cluster)
+        tiles = self.tiles.reshape(side, k, side, k).swapaxes(1, 2)
+        for start in range(0, len(stale), RELAX_BATCH):
+            batch = np.array(stale[start:start + RELAX_BATCH])
+            widest = max(max(len(self.cluster_nodes[cluster]) for cluster in batch), 1)
+            distances = np.full((len(batch), widest, k * k), np.inf, dtype=np.float32)
+            local = []
+            for i, cluster in enumerate(batch):
+                nodes = self.cluster_nodes[cluster]
+                top, left = cluster // side * k, cluster % side * k
+                positions = (nodes // size - top) * k + nodes % size - left
+                distances[i, np.arange(len(nodes)), positions] = 0
+                local.append(positions)
+            distances = distances.reshape(len(batch), widest, k, k)
+            _relax(distances, tiles[batch // side, batch % side][:, None])
+            distances = distances.reshape(len(batch), widest, k * k)
+            for i, cluster in enumerate(batch):
+                positions = local[i]
+                self.cluster_costs[cluster] = distances[i, :len(positions)][:, positions].tolist()
+        self.clusters_recomputed += len(stale)
+    
+    def _local_search(self, source, cluster, target=None, reverse=False):
+        size, k = self.size, self.cluster_size
+        top, left = cluster // self.per_side * k, cluster % self.per_side * k
+        bottom, right = min(top + k, size), min(left + k, size)
+        passable, costs = self.passable, self.costs
+        distance = {source: 0.0}
+        parent = {source: None}
+        done = set()
+        heap = [(0.0, source)]
+        while heap:
+            current_cost, current = heapq.heappop(heap)
+            if current in done:
+                continue
+            done.add(current)
+            if current == target:
+                break
+            row, col = divmod(current, size)
+            for next_row, next_col in ((row, col + 1), (row + 1, col), (row, col - 1), (row - 1, col)):
+                if top <= next_row < bottom and left <= next_col < right:
+                    neighbor = next_row * size + next_col
+                    if passable[neighbor] and neighbor not in done:
+                        new_cost = current_cost + (costs[current] if reverse else costs[neighbor])
+                        if new_cost < distance.get(neighbor, float("inf")):
+                            distance[neighbor] = new_cost
+                            parent[neighbor] = current
+                            heapq.heappush(heap, (new_cost, neighbor))
+        return distance, parent
+    
+    def refine_leg(self, source, target):
+        if self.cluster_of(source) != self.cluster_of(target):
+            return [target]
+        _, parent = self._local_search(source, self.cluster_of(source), target)
+        cells = []
+        node = target
+        while node != source:
+            cells.append(node)
+            node = parent[node]
+        cells.reverse()
+        return cells
+    
+    def _edges(self, node):
+        slot = self.node_slot.get(node)
+        if slot is not None:
+            cluster, i = slot
+            for neighbor, cost in zip(self.cluster_nodes[cluster].tolist(), self.cluster_costs[cluster][i]):
+                if neighbor != node and cost != float("inf"):
+                    yield neighbor, cost
+        yield from self.links.get(node, {}).items()
+    
+    def plan(self, start, goal):
+        self.sync()
+        grid = self.city_grid.grid
+        if not is_valid_position(grid, start) or not is_valid_position(grid, goal):
+            return None, 0
+        size = self.size
+        source = start[0] * size + start[1]
+        target = goal[0] * size + goal[1]
+        if not self.passable[source] or not self.passable[target]:
+            return None, 0
+        start_cluster, goal_cluster = self.cluster_of(source), self.cluster_of(target)
+        reach, _ = self._local_search(source, start_cluster)
+        exits = {node: reach[node] for node in self.cluster_nodes[start_cluster].tolist() if node in reach and node != source}
+        if target in reach:
+            exits[target] = reach[target]
+        back, _ = self._local_search(target, goal_cluster, reverse=True)
+        entries = {node: back[node] for node in self.cluster_nodes[goal_cluster].tolist() if node in back}
+        goal_row, goal_col = goal
+        g = {source: 0.0}
+        parent = {source: None}
+        closed = set()
+        heap = [(abs(start[0] - goal_row) + abs(start[1] - goal_col), source)]
+        nodes_expanded = 0
+        while heap:
+            _, current = heapq.heappop(heap)
+            if current in closed:
+                continue
+            closed.add(current)
+            nodes_expanded += 1
+            if current == target:
+                waypoints = []
+                node = current
+                while node is not None:
+                    waypoints.append(node)
+                    node = parent[node]
+                waypoints.reverse()
+                return HierarchicalRoute(self, waypoints, g[target]), nodes_expanded
+            edges = list(exits.items()) if current == source else list(self._edges(current))
+            if current == source:
+                edges.extend(self.links.get(source, {}).items())
+            if current in entries:
+                edges.append((target, entries[current]))
+            for neighbor, cost in edges:
+                new_g = g[current] + cost
+                if neighbor not in closed and new_g < g.get(neighbor, float("inf")):
+                    g[neighbor] = new_g
+                    parent[neighbor] = current
+                    row, col = divmod(neighbor, size)
+                    heapq.heappush(heap, (new_g + abs(row - goal_row) + abs(col - goal_col), neighbor))
+        return None, nodes_expanded
@@ -0,0 +1,133 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+import numpy as np
+
+PHASES = ('obstacles_ns', 'search_ns', 'reconstruct_ns', 'cost_ns', 'total_ns')
+COUNTERS = ('nodes_expanded', 'heap_pushes', 'heap_pops', 'stale_pops', 'max_frontier')
+PROFILERS = ('cprofile', 'sampling')
+SAMPLE_INTERVAL = 0.001
+HISTOGRAM_BINS = 10
+PROFILE_TOP = 20
+
+def _location(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+
+class SamplingProfiler:
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.own = Counter()
+        self.cumulative = Counter()
+        self.samples = 0
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+    
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+        self._sampler.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._sampler.join()
+        return False
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own[_location(frame.f_code)] += 1
+            seen = set()
+            while frame is not None:
+                location = _location(frame.f_code)
+                if location not in seen:
+                    seen.add(location)
+                    self.cumulative[location] += 1
+                frame = frame.f_back
+    
+    def report(self, top=PROFILE_TOP):
+        return [{'function': location, 'own_samples': self.own[location], 'samples': samples}
+                for location, samples in self.cumulative.most_common(top)]
+
+class CProfileProfiler:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+    
+    def __enter__(self):
+        self.profile.enable()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.profile.disable()
+        return False
+    
+    def report(self, top=PROFILE_TOP):
+        stats = pstats.Stats(self.profile).stats
+        rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+        return [{'function': f"{os.path.basename(filename)}:{line}({name})", 'calls': calls,
+                 'own_s': own_time, 'cumulative_s': cumulative_time}
+                for (filename, line, name), (_, calls, own_time, cumulative_time, _) in rows]
+
+class Instrumentation:
+    def __init__(self, profile=None, sample_interval=SAMPLE_INTERVAL):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"Unknown profiler: {profile}")
+        self.profile = profile
+        self.sample_interval = sample_interval
+        self.runs = 0
+    
+    def profiler(self):
+        if self.profile == 'cprofile':
+            return CProfileProfiler()
+        if self.profile == 'sampling':
+            return SamplingProfiler(self.sample_interval)
+        return None
+    
+    def record(self, phases, stats, nodes_expanded, profiler=None):
+        self.runs += 1
+        metrics = dict.fromkeys(PHASES + COUNTERS)
+        metrics.update(phases)
+        for name in COUNTERS[1:]:
+            metrics[name] = stats.get(name)
+        metrics['nodes_expanded'] = nodes_expanded
+        reconstruct_ns = stats.get('reconstruct_ns')
+        if reconstruct_ns is not None and metrics['search_ns'] is not None:
+            metrics['reconstruct_ns'] = reconstruct_ns
+            metrics['search_ns'] = max(0, metrics['search_ns'] - reconstruct_ns)
+        if profiler is not None:
+            metrics['profile'] = {'profiler': self.profile, 'functions': profiler.report()}
+        return metrics
+
+def histogram(values, bins=HISTOGRAM_BINS):
+    values = np.asarray(values, dtype=np.float64)
+    if not values.size:
+        return {'count': 0}
+    counts, edges = np.histogram(values, bins=bins)
+    p50, p90, p99 = np.percentile(values, (50, 90, 99))
+    return {
+        'count': int(values.size),
+        'min': float(values.min()),
+        'mean': float(values.mean()),
+        'p50': float(p50),
+        'p90': float(p90),
+        'p99': float(p99),
+        'max': float(values.max()),
+        'edges': edges.tolist(),
+        'counts': counts.tolist()
+    }
+
+def summarize(results, bins=HISTOGRAM_BINS):
+    summary = {}
+    for name in PHASES + COUNTERS:
+        values = [result.metrics[name] for result in results
+                  if result.metrics is not None and result.metrics.get(name) is not None]
+        summary[name] = histogram(values, bins)
+    return summary
@@ -0,0 +1,175 @@
+import heapq
+import numpy as np
+
+ROW_STEPS = (0, 1, 0, -1)
+COL_STEPS = (1, 0, -1, 0)
+RIGHT, DOWN, LEFT, UP = range(4)
+
+def _scan(stop, free, axis, backward):
+    length = stop.shape[axis]
+    positions = np.arange(length).reshape((1, -1) if axis == 1 else (-1, 1))
+    events = np.where(stop, positions, -1 if backward else length)
+    if backward:
+        nearest = np.maximum.accumulate(events, axis=axis)
+    else:
+        nearest = np.flip(np.minimum.accumulate(np.flip(events, axis=axis), axis=axis), axis=axis)
+    following = np.full(stop.shape, -1 if backward else length, dtype=np.int64)
+    if axis == 1:
+        if backward:
+            following[:, 1:] = nearest[:, :-1]
+        else:
+            following[:, :-1] = nearest[:, 1:]
+    else:
+        if backward:
+            following[1:, :] = nearest[:-1, :]
+        else:
+            following[:-1, :] = nearest[1:, :]
+    distance = np.abs(following - positions)
+    inside = (following >= 0) & (following < length)
+    hit_free = np.zeros(stop.shape, dtype=bool)
+    hit_free[inside] = np.take_along_axis(free, np.clip(following, 0, length - 1), axis=axis)[inside]
+    return np.where(hit_free, distance, -(distance - 1)).astype(np.int32)
+
+class JumpTable:
+    def __init__(self, city_grid):
+        self.city_grid = city_grid
+        self.generation = city_grid.generation
+        self.traffic = city_grid.traffic_cells.copy()
+        self.size = city_grid.size
+        rows = cols = self.size
+        self.jumps = np.zeros((4, rows, cols), dtype=np.int32)
+        self.vertical_events = np.zeros((2, rows, cols), dtype=bool)
+        self._refresh_cells()
+        self._update_rows(np.arange(rows))
+        self._update_columns(np.arange(cols))
+    
+    def _refresh_cells(self):
+        index = self.city_grid.neighbor_index
+        shape = (self.size, self.size)
+        passable = index.passable.reshape(shape)
+        self.free = passable & (index.costs.reshape(shape) == 1)
+        self.weighted = passable & ~self.free
+        padded = np.pad(self.weighted, 1)
+        near_weighted = padded[:-2, 1:-1] | padded[2:, 1:-1] | padded[1:-1, :-2] | padded[1:-1, 2:]
+        self.boundary = self.free & near_weighted
+        self.padded_free = np.pad(self.free, 1)
+    
+    def _update_rows(self, rows):
+        w = self.padded_free
+        center = w[rows + 1, 1:-1]
+        above_row = w[rows]
+        below_row = w[rows + 2]
+        above, below = above_row[:, 1:-1], below_row[:, 1:-1]
+        boundary = self.boundary[rows]
+        right_events = center & (boundary | (above & ~above_row[:, :-2]) | (below & ~below_row[:, :-2]))
+        left_events = center & (boundary | (above & ~above_row[:, 2:]) | (below & ~below_row[:, 2:]))
+        self.jumps[RIGHT, rows] = _scan(right_events | ~center, center, axis=1, backward=False)
+        self.jumps[LEFT, rows] = _scan(left_events | ~center, center, axis=1, backward=True)
+        
+        found = (self.jumps[RIGHT, rows] > 0) | (self.jumps[LEFT, rows] > 0) | boundary
+        left, right = w[rows + 1, :-2], w[rows + 1, 2:]
+        down_events = center & (found | (left & ~above_row[:, :-2]) | (right & ~above_row[:, 2:]))
+        up_events = center & (found | (left & ~below_row[:, :-2]) | (right & ~below_row[:, 2:]))
+        changed = (self.vertical_events[0, rows] != down_events) | (self.vertical_events[1, rows] != up_events)
+        self.vertical_events[0, rows] = down_events
+        self.vertical_events[1, rows] = up_events
+        return np.flatnonzero(changed.any(axis=0))
+    
+    def _update_columns(self, cols):
+        free = self.free[:, cols]
+        self.jumps[DOWN][:, cols] = _scan(self.vertical_events[0][:, cols] | ~free, free, axis=0, backward=False)
+        self.jumps[UP][:, cols] = _scan(self.vertical_events[1][:, cols] | ~free, free, axis=0, backward=True)
+    
+    def update(self, changed):
+        self._refresh_cells()
+        rows, cols = np.divmod(changed, self.size)
+        affected_rows = np.unique(np.clip(np.concatenate([rows - 1, rows, rows + 1]), 0, self.size - 1))
+        event_cols = self._update_rows(affected_rows)
+        affected_cols = np.unique(np.clip(np.concatenate([cols - 1, cols, cols + 1, event_cols]), 0, self.size - 1))
+        self._update_columns(affected_cols)
+        self.traffic = self.city_grid.traffic_cells.copy()
+    
+    def jump(self, row, col, direction, goal):
+        distance = int(self.jumps[direction, row, col])
+        span = distance if distance > 0 else -distance
+        goal_row, goal_col = goal
+        if direction == RIGHT or direction == LEFT:
+            step = COL_STEPS[direction]
+            offset = (goal_col - col) * step
+            if goal_row == row and 0 < offset <= span:
+                return goal, offset
+            return ((row, col + step * distance), distance) if distance > 0 else (None, 0)
+        step = ROW_STEPS[direction]
+        offset = (goal_row - row) * step
+        if 0 < offset <= span and (distance <= 0 or offset < distance):
+            if goal_col == col:
+                return goal, offset
+            side = RIGHT if goal_col > col else LEFT
+            reach = int(self.jumps[side, goal_row, col])
+            if abs(goal_col - col) <= (reach if reach > 0 else -reach):
+                return (goal_row, col), offset
+        return ((row + step * distance, col), distance) if distance > 0 else (None, 0)
+
+def jump_point_search(table, start, goal):
+    index = table.city_grid.neighbor_index
+    size = table.size
+    costs = index.costs
+    passable = index.passable
+    free = table.free
+    g = {start: 0.0}
+    parent = {start: None}
+    arrival = {start: None}
+    closed = set()
+    heap = [(abs(start[0] - goal[0]) + abs(start[1] - goal[1]), start)]
+    nodes_expanded = 0
+    while heap:
+        _, current = heapq.heappop(heap)
+        if current in closed:
+            continue
+        closed.add(current)
+        nodes_expanded += 1
+        if current == goal:
+            return _unpack(parent, goal), nodes_expanded
+        row, col = current
+        came = arrival[current]
+        current_free = free[row, col]
+        for direction in range(4):
+            if came is not None and direction == (came + 2) % 4:
+                continue
+            next_row, next_col = row + ROW_STEPS[direction], col + COL_STEPS[direction]
+            if not (0 <= next_row < size and 0 <= next_col < size) or not passable[next_row * size + next_col]:
+                continue
+            if current_free and free[next_row, next_col]:
+                successor, distance = table.jump(row, col, direction, goal)
+                if successor is None:
+                    continue
+                new_g = g[current] + distance
+                heading = direction
+            else:
+                successor = (next_row, next_col)
+                new_g = g[current] + float(costs[next_row * size + next_col])
+                heading = None
+            if successor not in closed and new_g < g.get(successor, float("inf")):
+                g[successor] = new_g
+                parent[successor] = current
+                arrival[successor] = heading
+                h = abs(successor[0] - goal[0]) + abs(successor[1] - goal[1])
+                heapq.heappush(heap, (new_g + h, successor))
+    return None, nodes_expanded
+
+def _unpack(parent, goal):
+    corners = []
+    node = goal
+    while node is not None:
+        corners.append(node)
+        node = parent[node]
+    corners.reverse()
+    path = [corners[0]]
+    for (row, col), (next_row, next_col) in zip(corners, corners[1:]):
+        step_row = (next_row > row) - (next_row < row)
+        step_col = (next_col > col) - (next_col < col)
+        while (row, col) != (next_row, next_col):
+            row += step_row
+            col += step_col
+            path.append((row, col))
+    return path
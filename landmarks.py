@@ -0,0 +1,174 @@
+import hashlib
+import os
+import zipfile
+import numpy as np
+from distance_field import compute_distance_field
+
+NUM_LANDMARKS = 8
+ACTIVE_LANDMARKS = 2
+UNREACHABLE = np.iinfo(np.uint16).max
+
+def map_fingerprint(city_grid, count=NUM_LANDMARKS):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.array([city_grid.size, count], dtype=np.int64).tobytes())
+    digest.update(np.packbits(city_grid.grid.ravel() == -1).tobytes())
+    digest.update(np.ascontiguousarray(city_grid.terrain_costs, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+class LandmarkTable:
+    def __init__(self, landmarks, distances, costs, size, fingerprint=None):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.costs = costs
+        self.size = size
+        self.fingerprint = fingerprint
+        self.generation = None
+        self._goal = None
+        self._potential_array = None
+    
+    @classmethod
+    def build(cls, city_grid, count=NUM_LANDMARKS):
+        size = city_grid.size
+        open_cells = np.flatnonzero(city_grid.grid.ravel() != -1)
+        costs = city_grid.neighbor_index.costs
+        if open_cells.size == 0:
+            return cls(np.empty(0, dtype=np.int64), np.empty((0, size * size), dtype=np.uint16), costs, size, map_fingerprint(city_grid, count))
+        seed = open_cells[open_cells.size // 2]
+        closest = compute_distance_field(city_grid, divmod(int(seed), size), ignore_traffic=True).distances
+        landmarks = []
+        fields = []
+        for _ in range(min(count, open_cells.size)):
+            landmark = int(np.argmax(np.where(np.isfinite(closest), closest, -1)))
+            if landmark in landmarks:
+                break
+            distances = compute_distance_field(city_grid, divmod(landmark, size), ignore_traffic=True).distances
+            landmarks.append(landmark)
+            fields.append(distances)
+            closest = distances if len(fields) == 1 else np.minimum(closest, distances)
+        fields = np.array(fields)
+        finite = np.isfinite(fields)
+        if np.all(costs == np.floor(costs)) and fields[finite].max(initial=0) < UNREACHABLE:
+            distances = np.where(finite, fields, UNREACHABLE).astype(np.uint16)
+        else:
+            distances = fields.astype(np.float32)
+        return cls(np.array(landmarks, dtype=np.int64), distances, costs, size, map_fingerprint(city_grid, count))
+    
+    @classmethod
+    def load_or_build(cls, city_grid, directory=None, count=NUM_LANDMARKS):
+        fingerprint = map_fingerprint(city_grid, count)
+        if directory is not None:
+            path = os.path.join(directory, f"landmarks-{fingerprint}.npz")
+        elif city_grid.map_path is not None:
+            path = f"{city_grid.map_path}.landmarks.npz"
+        else:
+            path = None
+        if path is not None and os.path.exists(path):
+            try:
+                table = cls.load(path, city_grid)
+            except (OSError, EOFError, KeyError, ValueError, zipfile.BadZipFile):
+                table = None
+            if table is not None and table.fingerprint == fingerprint:
+                return table
+        table = cls.build(city_grid, count)
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            table.save(path)
+        return table
+    
+    @classmethod
+    def load(cls, path, city_grid):
+        with np.load(path) as data:
+            return cls(data['landmarks'], data['distances'], city_grid.neighbor_index.costs, int(data['size']), str(data['fingerprint']))
+    
+    def save(self, path):
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as handle:
+            np.savez(handle, landmarks=self.landmarks, distances=self.distances, size=self.size, fingerprint=self.fingerprint)
+        os.replace(temporary, path)
+    
+    @property
+    def nbytes(self):
+        return self.distances.nbytes + self.landmarks.nbytes
+    
+    def _field(self, i):
+        field = self.distances[i].astype(np.float32)
+        if self.distances.dtype == np.uint16:
+            field[self.distances[i] == UNREACHABLE] = np.inf
+        return field
+    
+    def bounds(self, sources, targets):
+        sources = np.array([row * self.size + col for row, col in sources], dtype=np.int64)
+        targets = np.array([row * self.size + col for row, col in targets], dtype=np.int64)
+        source_rows, source_cols = np.divmod(sources, self.size)
+        target_rows, target_cols = np.divmod(targets, self.size)
+        bound = (np.abs(source_rows[:, None] - target_rows[None, :]) + np.abs(source_cols[:, None] - target_cols[None, :])).astype(np.float64)
+        for i in range(len(self.landmarks)):
+            field = self._field(i).astype(np.float64)
+            start, end = field[sources][:, None], field[targets][None, :]
+            with np.errstate(invalid='ignore'):
+                bound = np.fmax(bound, end - start)
+                bound = np.fmax(bound, (start - self.costs[sources][:, None]) - (end - self.costs[targets][None, :]))
+        return bound
+    
+    def estimate(self, goal, start=None, active=ACTIVE_LANDMARKS):
+        size = self.size
+        n = size * size
+        target = goal[0] * size + goal[1]
+        goal_x, goal_y = goal
+        distances = memoryview(self.distances.reshape(-1))
+        costs = memoryview(self.costs)
+        missing = UNREACHABLE if self.distances.dtype == np.uint16 else float("inf")
+        goal_cost = costs[target]
+        inf = float("inf")
+        chosen = [i for i in range(len(self.landmarks)) if distances[i * n + target] != missing]
+        if start is not None and len(chosen) > active:
+            source = start[0] * size + start[1]
+            
+            def strength(i):
+                value = distances[i * n + source]
+                if value == missing:
+                    return -1
+                to_goal = distances[i * n + target]
+                return max(to_goal - value, value - to_goal + goal_cost - costs[source])
+            
+            chosen = sorted(chosen, key=strength, reverse=True)[:active]
+        terms = [(i * n, distances[i * n + target]) for i in chosen]
+        
+        def estimate(node):
+            x, y = divmod(node, size)
+            bound = abs(x - goal_x) + abs(y - goal_y)
+            shift = goal_cost - costs[node]
+            for offset, to_goal in terms:
+                value = distances[offset + node]
+                if value == missing:
+                    return inf
+                if to_goal - value > bound:
+                    bound = to_goal - value
+                if value - to_goal + shift > bound:
+                    bound = value - to_goal + shift
+            return bound
+        
+        estimate.potential = lambda: self._potential(goal, chosen)
+        return estimate
+    
+    def _potential(self, goal, landmarks):
+        target = goal[0] * self.size + goal[1]
+        rows, cols = np.divmod(np.arange(self.size * self.size), self.size)
+        bound = (np.abs(rows - goal[0]) + np.abs(cols - goal[1])).astype(np.float64)
+        costs = self.costs.astype(np.float64)
+        shift = costs[target] - costs
+        for i in landmarks:
+            field = self._field(i).astype(np.float64)
+            to_goal = field[target]
+            if not np.isfinite(to_goal):
+                continue
+            np.maximum(bound, to_goal - field, out=bound)
+            np.maximum(bound, field - to_goal + shift, out=bound)
+        return bound
+    
+    def potential(self, goal):
+        target = goal[0] * self.size + goal[1]
+        if target != self._goal:
+            self._potential_array = self._potential(goal, range(len(self.landmarks)))
+            self._goal = target
+        return self._potential_array
@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+import numpy as np
+from server import DEFAULT_HOST, DEFAULT_PORT, READ_LIMIT
+
+async def _connect(host, port, path):
+    if path is not None:
+        return await asyncio.open_unix_connection(path, limit=READ_LIMIT)
+    return await asyncio.open_connection(host, port, limit=READ_LIMIT)
+
+async def _call(reader, writer, request):
+    writer.write((json.dumps(request) + "\n").encode())
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+async def _drive(host, port, path, requests, window):
+    reader, writer = await _connect(host, port, path)
+    slots = asyncio.Semaphore(window)
+    sent = {}
+    latencies = []
+    responses = []
+    
+    async def receive():
+        for _ in range(len(requests)):
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - sent.pop(response['id']))
+            responses.append(response)
+            slots.release()
+    
+    receiver = asyncio.ensure_future(receive())
+    for request in requests:
+        await slots.acquire()
+        sent[request['id']] = time.perf_counter()
+        writer.write((json.dumps(request) + "\n").encode())
+        await writer.drain()
+    await receiver
+    writer.close()
+    return latencies, responses
+
+async def run_load(host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, count=1000, connections=4, window=32,
+                   algorithm="A*", distinct=None, time_step=None, seed=0):
+    reader, writer = await _connect(host, port, path)
+    pairs = (await _call(reader, writer, {'op': 'sample', 'count': distinct or count, 'seed': seed}))['pairs']
+    writer.close()
+    if not pairs:
+        raise ValueError("server map has no open cells")
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(len(pairs), size=count) if distinct else np.arange(count)
+    requests = []
+    for i, pick in enumerate(picks.tolist()):
+        request = {'id': i, 'start': pairs[pick][0], 'goal': pairs[pick][1], 'algorithm': algorithm}
+        if time_step is not None:
+            request['time_step'] = time_step
+        requests.append(request)
+    started = time.perf_counter()
+    runs = await asyncio.gather(*(_drive(host, port, path, requests[i::connections], window)
+                                  for i in range(connections)))
+    elapsed = time.perf_counter() - started
+    latencies = np.array([latency for run_latencies, _ in runs for latency in run_latencies]) * 1000.0
+    responses = [response for _, run_responses in runs for response in run_responses]
+    p50, p99 = np.percentile(latencies, (50, 99)) if latencies.size else (None, None)
+    return {
+        'requests': len(responses),
+        'errors': sum(1 for response in responses if 'error' in response),
+        'failed': sum(1 for response in responses if response.get('success') is False),
+        'coalesced': sum(1 for response in responses if response.get('coalesced')),
+        'seconds': elapsed,
+        'requests_per_sec': len(responses) / elapsed if elapsed else None,
+        'p50_ms': float(p50) if p50 is not None else None,
+        'p99_ms': float(p99) if p99 is not None else None,
+        'max_ms': float(latencies.max()) if latencies.size else None
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test a running route server.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--socket", help="Unix socket path (instead of --host/--port)")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--window", type=int, default=32, help="pipelined requests in flight per connection")
+    parser.add_argument("--algorithm", default="A*")
+    parser.add_argument("--distinct", type=int, help="draw requests from this many distinct routes")
+    parser.add_argument("--time-step", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    
+    report = asyncio.run(run_load(args.host, args.port, args.socket, args.requests, args.connections, args.window,
+                                  args.algorithm, args.distinct, args.time_step, args.seed))
+    print(json.dumps(report, indent=2))
+    return 1 if report['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
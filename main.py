@@ -1,16 +1,76 @@
+import argparse
+import sys
 from city_grid import CityGrid
-from simulation import Simulation
-from visualization import CityVisualizer
+from simulation import Simulation, ALGORITHMS, PLANNERS
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Autonomous Delivery Agent Simulator")
+    parser.add_argument("--headless", action="store_true", help="run without the GUI and stream JSON lines")
+    parser.add_argument("--serve", action="store_true", help="answer JSON-lines route requests over a socket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="listen on this Unix socket instead of --host/--port")
+    parser.add_argument("--workers", type=int, help="search processes for --serve (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=256, help="requests in flight before --serve stops reading")
+    parser.add_argument("--map", default="medium", help="small, medium, large, dynamic or procedural")
+    parser.add_argument("--algorithm", default="A*", choices=list(ALGORITHMS) + list(PLANNERS))
+    parser.add_argument("--steps", type=int, default=1)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--size", type=int, help="map size for procedural maps")
+    parser.add_argument("--obstacles", type=int, help="dynamic obstacles for procedural maps")
+    parser.add_argument("--output", help="JSON lines file (default: stdout)")
+    parser.add_argument("--include-path", action="store_true")
+    parser.add_argument("--map-file", help="open a map saved with --save-map instead of generating one")
+    parser.add_argument("--save-map", help="write the generated map to this file")
+    parser.add_argument("--landmark-dir", help="directory for cached A* (ALT) landmark tables")
+    parser.add_argument("--metrics", action="store_true", help="add per-phase timings and heap counters to each record")
+    parser.add_argument("--profile", choices=["cprofile", "sampling"], help="profile each search (implies --metrics)")
+    return parser.parse_args(argv)
+
+def run_gui(landmark_dir=None):
+    from visualization import CityVisualizer
     print("Starting Autonomous Delivery Agent Simulator...")
     
     city = CityGrid(map_type="medium")
-    simulation = Simulation(city)
+    simulation = Simulation(city, landmark_dir=landmark_dir)
     visualizer = CityVisualizer(simulation)
     
     print("Simulator started successfully!")
     visualizer.show()
 
+def run_cli(args):
+    from headless import run_headless
+    options = dict(map_type=args.map, algorithm=args.algorithm, steps=args.steps, seed=args.seed,
+                   size=args.size, num_dynamic_obstacles=args.obstacles, include_path=args.include_path,
+                   landmark_dir=args.landmark_dir, map_file=args.map_file, save_map=args.save_map,
+                   metrics=args.metrics, profile=args.profile)
+    if args.output:
+        with open(args.output, "w") as output:
+            run_headless(output=output, **options)
+    else:
+        run_headless(**options)
+
+def run_service(args):
+    from server import run_server
+    options = {}
+    if args.size is not None:
+        options['size'] = args.size
+    if args.obstacles is not None:
+        options['num_dynamic_obstacles'] = args.obstacles
+    city = CityGrid.load(args.map_file) if args.map_file else CityGrid(args.map, seed=args.seed, **options)
+    simulation = Simulation(city, landmark_dir=args.landmark_dir)
+    simulation.set_algorithm(args.algorithm)
+    run_server(simulation, host=args.host, port=args.port, path=args.socket, workers=args.workers,
+               max_pending=args.max_pending)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.serve:
+        run_service(args)
+    elif args.headless:
+        run_cli(args)
+    else:
+        run_gui(args.landmark_dir)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(sys.argv[1:])
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import struct
+import numpy as np
+
+MAGIC = b"CITYMAP\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIIiiii16s")
+HEADER_SIZE = 64
+OBSTACLE_FIELDS = 6
+
+def _checksum(*arrays):
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array).view(np.uint8).ravel())
+    return digest.digest()
+
+def write_map(path, grid, terrain_costs, obstacles, start_pos=None, goal_pos=None):
+    grid = np.ascontiguousarray(grid, dtype=np.int8)
+    size = grid.shape[0]
+    if grid.shape != (size, size) or np.shape(terrain_costs) != grid.shape:
+        raise ValueError("grid and terrain costs must be square arrays of the same shape")
+    terrain = np.asarray(terrain_costs)
+    if np.any(terrain != np.round(terrain)) or terrain.min(initial=0) < 0 or terrain.max(initial=0) > 255:
+        raise ValueError("terrain costs must be whole numbers between 0 and 255")
+    terrain = np.ascontiguousarray(terrain, dtype=np.uint8)
+    obstacles = np.ascontiguousarray(np.reshape(obstacles, (-1, OBSTACLE_FIELDS)), dtype='<i4')
+    start_row, start_col = start_pos if start_pos is not None else (-1, -1)
+    goal_row, goal_col = goal_pos if goal_pos is not None else (-1, -1)
+    header = HEADER.pack(MAGIC, VERSION, 0, size, len(obstacles), start_row, start_col, goal_row, goal_col,
+                         _checksum(grid, terrain, obstacles))
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as handle:
+        handle.write(header.ljust(HEADER_SIZE, b"\x00"))
+        handle.write(grid.tobytes())
+        handle.write(terrain.tobytes())
+        handle.write(obstacles.tobytes())
+    os.replace(temporary, path)
+
+def read_header(path):
+    with open(path, 'rb') as handle:
+        raw = handle.read(HEADER.size)
+    if len(raw) < HEADER.size or raw[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not a city map file")
+    magic, version, flags, size, count, start_row, start_col, goal_row, goal_col, checksum = HEADER.unpack(raw)
+    if version != VERSION:
+        raise ValueError(f"{path} uses map format version {version}, expected {VERSION}")
+    expected = HEADER_SIZE + 2 * size * size + count * OBSTACLE_FIELDS * 4
+    if os.path.getsize(path) != expected:
+        raise ValueError(f"{path} is truncated or has trailing data")
+    return {
+        'size': size,
+        'obstacle_count': count,
+        'start_pos': (start_row, start_col) if start_row >= 0 else None,
+        'goal_pos': (goal_row, goal_col) if goal_row >= 0 else None,
+        'checksum': checksum
+    }
+
+def read_map(path, verify=False):
+    header = read_header(path)
+    size = header['size']
+    cells = size * size
+    grid = np.memmap(path, dtype=np.int8, mode='c', offset=HEADER_SIZE, shape=(size, size))
+    terrain = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER_SIZE + cells, shape=(size, size))
+    obstacles = np.fromfile(path, dtype='<i4', count=header['obstacle_count'] * OBSTACLE_FIELDS,
+                            offset=HEADER_SIZE + 2 * cells).reshape(-1, OBSTACLE_FIELDS)
+    if verify and _checksum(grid, terrain, obstacles) != header['checksum']:
+        raise ValueError(f"{path} failed its checksum")
+    header.update(grid=grid, terrain_costs=terrain, obstacles=obstacles)
+    return header
@@ -1,113 +1,511 @@
-from queue import PriorityQueue, Queue
+import heapq
+import sys
 import time
-from utils import manhattan_distance, get_neighbors, is_valid_position
+import numpy as np
+from utils import is_valid_position
+from jump_point import JumpTable, jump_point_search
+from landmarks import LandmarkTable
+
+SPACE_TIME_HORIZON = 256
+MAX_OCCUPANCY_STEPS = 4096
+WEIGHT = 2.0
+INITIAL_EPSILON = 3.0
+EPSILON_STEP = 0.5
+DEADLINE_MS = 50
+DEADLINE_CHECK = 256
+ALT_MATERIALIZE_FRACTION = 32
 
 class Pathfinder:
-    def __init__(self, city_grid):
-        self.grid = city_grid.grid
-        self.terrain_costs = city_grid.terrain_costs
-        self.size = city_grid.size
+    def __init__(self, city_grid, landmark_dir=None):
+        self.city_grid = city_grid
+        self.landmark_dir = landmark_dir
+        self.jump_table = None
+        self.landmark_table = None
+        self.occupancy = {}
+        self.occupancy_generation = None
+        self.last_stats = {}
+    
+    @property
+    def grid(self):
+        return self.city_grid.grid
+    
+    @property
+    def terrain_costs(self):
+        return self.city_grid.terrain_costs
+    
+    @property
+    def size(self):
+        return self.city_grid.size
     
     def bfs(self, start, goal):
+        return self._search(start, goal, unit_cost=True)
+    
+    def uniform_cost_search(self, start, goal):
+        return self._search(start, goal)
+    
+    def a_star(self, start, goal):
+        return self._search(start, goal, heuristic_weight=1)
+    
+    def a_star_alt(self, start, goal, cache_goal=False):
         if not is_valid_position(self.grid, start) or not is_valid_position(self.grid, goal):
             return None, 0
-        queue = Queue()
-        queue.put((start, [start]))
-        visited = set([start])
-        nodes_expanded = 0
-        while not queue.empty():
-            current, path = queue.get()
-            nodes_expanded += 1
-            if current == goal:
-                return path, nodes_expanded
-            for neighbor in get_neighbors(current, self.size):
-                if (is_valid_position(self.grid, neighbor) and neighbor not in visited):
-                    visited.add(neighbor)
-                    queue.put((neighbor, path + [neighbor]))
-        return None, nodes_expanded
+        table = self.landmarks()
+        if cache_goal:
+            return self._search(start, goal, potential=table.potential(goal))
+        return self._search(start, goal, estimate=table.estimate(goal, start))
     
-    def uniform_cost_search(self, start, goal):
+    def weighted_a_star(self, start, goal, weight=WEIGHT, deadline_ms=None):
+        return self._anytime_search(start, goal, weight, weight, EPSILON_STEP, deadline_ms)
+    
+    def ara_star(self, start, goal, deadline_ms=DEADLINE_MS, epsilon=INITIAL_EPSILON, step=EPSILON_STEP):
+        return self._anytime_search(start, goal, epsilon, 1.0, step, deadline_ms)
+    
+    def greedy_best_first(self, start, goal):
+        return self._search(start, goal, cost_weight=0, heuristic_weight=1)
+    
+    def bidirectional_ucs(self, start, goal):
+        return self._bidirectional_search(start, goal)
+    
+    def bidirectional_a_star(self, start, goal):
+        return self._bidirectional_search(start, goal, heuristic_weight=1)
+    
+    def jump_point_search(self, start, goal):
         if not is_valid_position(self.grid, start) or not is_valid_position(self.grid, goal):
             return None, 0
-        pq = PriorityQueue()
-        pq.put((0, start, [start]))
-        visited = set()
+        return jump_point_search(self._jump_table(), start, goal)
+    
+    def _jump_table(self):
+        table = self.jump_table
+        changed = None if table is None else self.city_grid.changed_cells(table.generation, table.traffic)
+        if changed is None:
+            table = self.jump_table = JumpTable(self.city_grid)
+        elif changed.size:
+            table.update(changed)
+        return table
+    
+    def occupied_at(self, time_step):
+        if self.occupancy_generation != self.city_grid.generation:
+            self.occupancy = {}
+            self.occupancy_generation = self.city_grid.generation
+        phase = self.city_grid.traffic_phase(time_step)
+        cells = self.occupancy.get(phase)
+        if cells is None:
+            if len(self.occupancy) >= MAX_OCCUPANCY_STEPS:
+                self.occupancy.clear()
+            cells = self.occupancy[phase] = frozenset(self.city_grid.traffic_at(phase).tolist())
+        return cells
+    
+    def space_time_a_star(self, start, goal, start_time=0, horizon=SPACE_TIME_HORIZON):
+        size = self.size
+        if not is_valid_position(self.grid, start) or not (0 <= goal[0] < size and 0 <= goal[1] < size) or self.grid[goal] == -1:
+            return None, 0
+        n = size * size
+        source = start[0] * size + start[1]
+        target = goal[0] * size + goal[1]
+        goal_x, goal_y = goal
+        index = self.city_grid.neighbor_index
+        offsets = memoryview(index.offsets)
+        targets = memoryview(index.targets)
+        costs = memoryview(index.costs)
+        occupied_at = self.occupied_at
+        period = self.city_grid.traffic_period
+        periodic = period <= MAX_OCCUPANCY_STEPS
+        self.last_stats = {'traffic_period': period, 'static_after': None if periodic else start_time + horizon}
+        unbounded = frozenset()
+        g = {source: 0.0}
+        parent = {source: -1}
+        closed = set()
+        heap = [(abs(start[0] - goal_x) + abs(start[1] - goal_y), source)]
+        push = heapq.heappush
+        pop = heapq.heappop
         nodes_expanded = 0
-        while not pq.empty():
-            cost, current, path = pq.get()
-            nodes_expanded += 1
-            if current == goal:
-                return path, nodes_expanded
-            if current in visited:
+        while heap:
+            _, state = pop(heap)
+            if state in closed:
                 continue
-            visited.add(current)
-            for neighbor in get_neighbors(current, self.size):
-                if is_valid_position(self.grid, neighbor) and neighbor not in visited:
-                    new_cost = cost + self.terrain_costs[neighbor]
-                    pq.put((new_cost, neighbor, path + [neighbor]))
+            closed.add(state)
+            nodes_expanded += 1
+            step, current = divmod(state, n)
+            if current == target:
+                states = []
+                while state != -1:
+                    states.append(state % n)
+                    state = parent[state]
+                return [divmod(cell, size) for cell in reversed(states)], nodes_expanded
+            current_g = g[state]
+            if step < horizon or periodic:
+                next_step = step + 1
+                if next_step == horizon + period:
+                    next_step = horizon
+                blocked = occupied_at(start_time + next_step)
+                moves = [(targets[edge], costs[targets[edge]]) for edge in range(offsets[current], offsets[current + 1])]
+                moves.append((current, costs[current]))
+            else:
+                next_step = horizon
+                blocked = unbounded
+                moves = [(targets[edge], costs[targets[edge]]) for edge in range(offsets[current], offsets[current + 1])]
+            for neighbor, cost in moves:
+                if neighbor in blocked:
+                    continue
+                successor = next_step * n + neighbor
+                new_g = current_g + cost
+                if successor not in closed and new_g < g.get(successor, float("inf")):
+                    g[successor] = new_g
+                    parent[successor] = state
+                    nx, ny = divmod(neighbor, size)
+                    push(heap, (new_g + abs(nx - goal_x) + abs(ny - goal_y), successor))
         return None, nodes_expanded
     
-    def a_star(self, start, goal):
+    def landmarks(self):
+        table = self.landmark_table
+        if table is None or table.generation != self.city_grid.generation:
+            table = self.landmark_table = LandmarkTable.load_or_build(self.city_grid, self.landmark_dir)
+            table.generation = self.city_grid.generation
+        return table
+    
+    def _search(self, start, goal, cost_weight=1, heuristic_weight=0, unit_cost=False, potential=None, estimate=None):
+        self.last_stats = {}
         if not is_valid_position(self.grid, start) or not is_valid_position(self.grid, goal):
             return None, 0
-        open_set = PriorityQueue()
-        open_set.put((0, start))
-        came_from = {}
-        g_score = {start: 0}
-        f_score = {start: manhattan_distance(start, goal)}
-        open_set_hash = {start}
+        size = self.size
+        n = size * size
+        source = start[0] * size + start[1]
+        target = goal[0] * size + goal[1]
+        goal_x, goal_y = goal
+        g_cost = np.full(n, np.inf)
+        parent = np.full(n, -1, dtype=np.int64)
+        closed = np.zeros(n, dtype=bool)
+        g = memoryview(g_cost)
+        came_from = memoryview(parent)
+        done = memoryview(closed)
+        index = self.city_grid.neighbor_index
+        offsets = memoryview(index.offsets)
+        targets = memoryview(index.targets)
+        weights = memoryview(index.weights)
+        g[source] = 0.0
+        if potential is not None:
+            potential = memoryview(potential)
+            heap = [(potential[source], source)]
+        elif estimate is not None:
+            heap = [(estimate(source), source)]
+        else:
+            heap = [(heuristic_weight * (abs(start[0] - goal_x) + abs(start[1] - goal_y)), source)]
+        push = heapq.heappush
+        pop = heapq.heappop
+        inf = float("inf")
         nodes_expanded = 0
-        while not open_set.empty():
-            current = open_set.get()[1]
-            open_set_hash.remove(current)
+        pushes = 1
+        max_frontier = 1
+        materialize_after = n // ALT_MATERIALIZE_FRACTION
+        while heap:
+            _, current = pop(heap)
+            if done[current]:
+                continue
+            done[current] = True
             nodes_expanded += 1
-            if current == goal:
-                path = [current]
-                while current in came_from:
-                    current = came_from[current]
-                    path.append(current)
-                return path[::-1], nodes_expanded
-            for neighbor in get_neighbors(current, self.size):
-                if not is_valid_position(self.grid, neighbor):
+            if current == target:
+                return self._finish(came_from, target, nodes_expanded, pushes, len(heap), max_frontier)
+            current_g = g[current]
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                weight = weights[edge]
+                if weight == inf or done[neighbor]:
                     continue
-                tentative_g_score = g_score[current] + self.terrain_costs[neighbor]
-                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
+                new_g = current_g + (1.0 if unit_cost else weight)
+                if new_g < g[neighbor]:
+                    g[neighbor] = new_g
                     came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = tentative_g_score + manhattan_distance(neighbor, goal)
-                    if neighbor not in open_set_hash:
-                        open_set.put((f_score[neighbor], neighbor))
-                        open_set_hash.add(neighbor)
-        return None, nodes_expanded
+                    if potential is not None:
+                        push(heap, (cost_weight * new_g + potential[neighbor], neighbor))
+                    elif estimate is not None:
+                        push(heap, (cost_weight * new_g + estimate(neighbor), neighbor))
+                    else:
+                        nx, ny = divmod(neighbor, size)
+                        push(heap, (cost_weight * new_g + heuristic_weight * (abs(nx - goal_x) + abs(ny - goal_y)), neighbor))
+                    pushes += 1
+            if estimate is not None and pushes > materialize_after:
+                potential = memoryview(estimate.potential())
+                estimate = None
+            if len(heap) > max_frontier:
+                max_frontier = len(heap)
+        return self._finish(came_from, -1, nodes_expanded, pushes, 0, max_frontier)
     
-    def greedy_best_first(self, start, goal):
+    def _anytime_search(self, start, goal, epsilon, final_epsilon, step, deadline_ms):
+        started = time.perf_counter()
+        deadline = None if deadline_ms is None else started + deadline_ms / 1000.0
+        self.last_stats = {'epsilon': None, 'iterations': 0, 'deadline_hit': False, 'elapsed_ms': 0.0}
         if not is_valid_position(self.grid, start) or not is_valid_position(self.grid, goal):
             return None, 0
-        pq = PriorityQueue()
-        pq.put((manhattan_distance(start, goal), start, [start]))
-        visited = set([start])
+        size = self.size
+        n = size * size
+        source = start[0] * size + start[1]
+        target = goal[0] * size + goal[1]
+        goal_x, goal_y = goal
+        g_cost = np.full(n, np.inf)
+        parent = np.full(n, -1, dtype=np.int64)
+        expanded_in = np.full(n, -1, dtype=np.int32)
+        g = memoryview(g_cost)
+        came_from = memoryview(parent)
+        closed = memoryview(expanded_in)
+        index = self.city_grid.neighbor_index
+        offsets = memoryview(index.offsets)
+        targets = memoryview(index.targets)
+        weights = memoryview(index.weights)
+        g[source] = 0.0
+        open_cells = [source]
+        inconsistent = []
+        push = heapq.heappush
+        pop = heapq.heappop
+        clock = time.perf_counter
+        inf = float("inf")
         nodes_expanded = 0
-        while not pq.empty():
-            _, current, path = pq.get()
+        pushes = 0
+        discarded = 0
+        max_frontier = 0
+        iteration = 0
+        bound = inf
+        timed_out = False
+        while True:
+            heap = []
+            for cell in set(open_cells).union(inconsistent):
+                x, y = divmod(cell, size)
+                heap.append((g[cell] + epsilon * (abs(x - goal_x) + abs(y - goal_y)), cell))
+            heapq.heapify(heap)
+            pushes += len(heap)
+            inconsistent = []
+            while heap:
+                key, current = heap[0]
+                if closed[current] == iteration:
+                    pop(heap)
+                    continue
+                if g[target] <= key:
+                    break
+                if deadline is not None and not nodes_expanded % DEADLINE_CHECK and clock() > deadline:
+                    timed_out = True
+                    break
+                pop(heap)
+                x, y = divmod(current, size)
+                if key != g[current] + epsilon * (abs(x - goal_x) + abs(y - goal_y)):
+                    continue
+                closed[current] = iteration
+                nodes_expanded += 1
+                current_g = g[current]
+                for edge in range(offsets[current], offsets[current + 1]):
+                    weight = weights[edge]
+                    if weight == inf:
+                        continue
+                    neighbor = targets[edge]
+                    new_g = current_g + weight
+                    if new_g < g[neighbor]:
+                        g[neighbor] = new_g
+                        came_from[neighbor] = current
+                        if closed[neighbor] == iteration:
+                            inconsistent.append(neighbor)
+                        else:
+                            nx, ny = divmod(neighbor, size)
+                            push(heap, (new_g + epsilon * (abs(nx - goal_x) + abs(ny - goal_y)), neighbor))
+                            pushes += 1
+                if len(heap) > max_frontier:
+                    max_frontier = len(heap)
+            discarded += len(heap)
+            iteration += 1
+            if g[target] == inf:
+                break
+            open_cells = [cell for _, cell in heap if closed[cell] != iteration - 1]
+            frontier = np.array(open_cells + inconsistent, dtype=np.int64)
+            if frontier.size:
+                rows, cols = np.divmod(frontier, size)
+                lower = float((g_cost[frontier] + np.abs(rows - goal_x) + np.abs(cols - goal_y)).min())
+                bound = min(bound, max(g[target] / lower, 1.0) if lower > 0 else 1.0)
+                if not timed_out:
+                    bound = min(bound, epsilon)
+            else:
+                bound = 1.0
+            if timed_out or bound <= final_epsilon or (deadline is not None and clock() > deadline):
+                break
+            epsilon = max(final_epsilon, min(epsilon - step, bound))
+        return self._finish(came_from, target if g[target] != inf else -1, nodes_expanded, pushes, discarded, max_frontier,
+                            epsilon=bound if g[target] != inf else None, iterations=iteration, deadline_hit=timed_out,
+                            elapsed_ms=(clock() - started) * 1000.0)
+    
+    def _bidirectional_search(self, start, goal, heuristic_weight=0):
+        self.last_stats = {}
+        if not is_valid_position(self.grid, start) or not is_valid_position(self.grid, goal):
+            return None, 0
+        size = self.size
+        n = size * size
+        source = start[0] * size + start[1]
+        target = goal[0] * size + goal[1]
+        if source == target:
+            return [start], 1
+        index = self.city_grid.neighbor_index
+        offsets = memoryview(index.offsets)
+        targets = memoryview(index.targets)
+        reverse = memoryview(index.reverse)
+        weights = memoryview(index.weights)
+        g_arrays = (np.full(n, np.inf), np.full(n, np.inf))
+        parent_arrays = (np.full(n, -1, dtype=np.int64), np.full(n, -1, dtype=np.int64))
+        closed_arrays = (np.zeros(n, dtype=bool), np.zeros(n, dtype=bool))
+        g = [memoryview(array) for array in g_arrays]
+        came_from = [memoryview(array) for array in parent_arrays]
+        done = [memoryview(array) for array in closed_arrays]
+        goal_x, goal_y = goal
+        start_x, start_y = start
+        ends = ((goal_x, goal_y), (start_x, start_y))
+        g[0][source] = 0.0
+        g[1][target] = 0.0
+        initial = heuristic_weight * (abs(start_x - goal_x) + abs(start_y - goal_y))
+        heaps = ([(initial, source)], [(initial, target)])
+        push = heapq.heappush
+        pop = heapq.heappop
+        inf = float("inf")
+        best = inf
+        meeting = -1
+        nodes_expanded = 0
+        pushes = 2
+        max_frontier = 2
+        while heaps[0] and heaps[1]:
+            top_forward = heaps[0][0][0]
+            top_backward = heaps[1][0][0]
+            if heuristic_weight:
+                if max(top_forward, top_backward) >= best:
+                    break
+                side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            else:
+                if top_forward + top_backward >= best:
+                    break
+                side = 0 if top_forward <= top_backward else 1
+            end_x, end_y = ends[side]
+            _, current = pop(heaps[side])
+            if done[side][current]:
+                continue
+            done[side][current] = True
             nodes_expanded += 1
-            if current == goal:
-                return path, nodes_expanded
-            for neighbor in get_neighbors(current, self.size):
-                if (is_valid_position(self.grid, neighbor) and neighbor not in visited):
-                    visited.add(neighbor)
-                    priority = manhattan_distance(neighbor, goal)
-                    pq.put((priority, neighbor, path + [neighbor]))
-        return None, nodes_expanded
+            g_side = g[side]
+            g_other = g[1 - side]
+            parents = came_from[side]
+            closed = done[side]
+            heap = heaps[side]
+            current_g = g_side[current]
+            for edge in range(offsets[current], offsets[current + 1]):
+                neighbor = targets[edge]
+                weight = weights[edge] if side == 0 else weights[reverse[edge]]
+                if weight == inf or closed[neighbor]:
+                    continue
+                new_g = current_g + weight
+                if new_g < g_side[neighbor]:
+                    g_side[neighbor] = new_g
+                    parents[neighbor] = current
+                    nx, ny = divmod(neighbor, size)
+                    push(heap, (new_g + heuristic_weight * (abs(nx - end_x) + abs(ny - end_y)), neighbor))
+                    pushes += 1
+                    if new_g + g_other[neighbor] < best:
+                        best = new_g + g_other[neighbor]
+                        meeting = neighbor
+            if len(heaps[0]) + len(heaps[1]) > max_frontier:
+                max_frontier = len(heaps[0]) + len(heaps[1])
+        started = time.perf_counter_ns()
+        forward = None
+        if meeting != -1:
+            forward = self._reconstruct(came_from[0], meeting)
+            node = came_from[1][meeting]
+            while node != -1:
+                forward.append(divmod(node, size))
+                node = came_from[1][node]
+        self._record_heap(nodes_expanded, pushes, len(heaps[0]) + len(heaps[1]), max_frontier, time.perf_counter_ns() - started)
+        return forward, nodes_expanded
+    
+    def _finish(self, parent, target, nodes_expanded, pushes, remaining, max_frontier, **stats):
+        started = time.perf_counter_ns()
+        path = self._reconstruct(parent, target) if target != -1 else None
+        self._record_heap(nodes_expanded, pushes, remaining, max_frontier, time.perf_counter_ns() - started, **stats)
+        return path, nodes_expanded
+    
+    def _record_heap(self, nodes_expanded, pushes, remaining, max_frontier, reconstruct_ns, **stats):
+        stats.update(heap_pushes=pushes, heap_pops=pushes - remaining, stale_pops=pushes - remaining - nodes_expanded,
+                     max_frontier=max_frontier, reconstruct_ns=reconstruct_ns)
+        self.last_stats = stats
+    
+    def _reconstruct(self, parent, target):
+        size = self.size
+        nodes = []
+        node = target
+        while node != -1:
+            nodes.append(node)
+            node = parent[node]
+        return [divmod(node, size) for node in reversed(nodes)]
 
 class PathfindingResult:
-    def __init__(self, algorithm_name, path, nodes_expanded, execution_time, path_cost):
+    __slots__ = ('algorithm_name', 'cells', 'stride', 'nodes_expanded', 'execution_time', 'path_cost', 'success',
+                 'cached', 'epsilon', 'metrics')
+    
+    def __init__(self, algorithm_name, path, nodes_expanded, execution_time, path_cost, cached=False, epsilon=None,
+                 metrics=None):
         self.algorithm_name = algorithm_name
         self.path = path
         self.nodes_expanded = nodes_expanded
         self.execution_time = execution_time
         self.path_cost = path_cost
+        self.cached = cached
+        self.epsilon = epsilon
+        self.metrics = metrics
+    
+    @property
+    def path(self):
+        if self.cells is None:
+            return None
+        stride = self.stride
+        return [divmod(cell, stride) for cell in self.cells.tolist()]
+    
+    @path.setter
+    def path(self, path):
         self.success = path is not None
+        if not path:
+            self.cells = None if path is None else np.empty(0, dtype=np.int32)
+            self.stride = 1
+            return
+        positions = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+        self.stride = int(positions[:, 1].max()) + 1
+        self.cells = (positions[:, 0] * self.stride + positions[:, 1]).astype(np.int32)
+    
+    @property
+    def path_length(self):
+        return 0 if self.cells is None else len(self.cells)
+    
+    def cached_copy(self, execution_time):
+        result = PathfindingResult(self.algorithm_name, None, 0, execution_time, self.path_cost, cached=True, epsilon=self.epsilon)
+        result.cells = self.cells
+        result.stride = self.stride
+        result.success = self.success
+        return result
+    
+    @property
+    def nbytes(self):
+        size = sys.getsizeof(self)
+        if self.cells is not None:
+            size += self.cells.nbytes + sys.getsizeof(self.cells)
+        if self.metrics is not None:
+            size += sys.getsizeof(self.metrics)
+        return size
+    
+    def to_dict(self, include_path=False):
+        record = {
+            'algorithm': self.algorithm_name,
+            'success': self.success,
+            'path_cost': float(self.path_cost),
+            'nodes_expanded': int(self.nodes_expanded),
+            'execution_time': self.execution_time,
+            'path_length': self.path_length,
+            'cached': self.cached,
+            'epsilon': self.epsilon
+        }
+        if self.metrics is not None:
+            record['metrics'] = self.metrics
+        if include_path:
+            record['path'] = [list(position) for position in self.path] if self.path else None
+        return record
     
     def __str__(self):
         status = "SUCCESS" if self.success else "FAILED"
-        return f"{self.algorithm_name}: {status} | Cost: {self.path_cost} | Nodes: {self.nodes_expanded} | Time: {self.execution_time:.4f}s"
\ No newline at end of file
+        bound = f" | Epsilon: {self.epsilon:.2f}" if self.epsilon is not None else ""
+        return f"{self.algorithm_name}: {status} | Cost: {self.path_cost} | Nodes: {self.nodes_expanded} | Time: {self.execution_time:.4f}s{bound}"
\ No newline at end of file
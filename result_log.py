@@ -0,0 +1,32 @@
+import json
+
+class ResultLog:
+    def __init__(self, target, include_path=False, flush_every=1):
+        self.owns_output = isinstance(target, str)
+        self.output = open(target, "a") if self.owns_output else target
+        self.include_path = include_path
+        self.flush_every = flush_every
+        self.count = 0
+    
+    def write(self, result, **fields):
+        record = dict(fields)
+        record.update(result.to_dict(include_path=self.include_path))
+        self.output.write(json.dumps(record) + "\n")
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.output.flush()
+    
+    def close(self):
+        if self.output is None:
+            return
+        self.output.flush()
+        if self.owns_output:
+            self.output.close()
+        self.output = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
@@ -0,0 +1,140 @@
+import asyncio
+import json
+import numpy as np
+from simulation import ALGORITHMS, PLANNERS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_PENDING = 256
+READ_LIMIT = 1 << 20
+
+def _position(value, name):
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise ValueError(f"{name} must be [row, col]")
+    return int(value[0]), int(value[1])
+
+class RouteServer:
+    def __init__(self, simulation, workers=None, max_pending=MAX_PENDING):
+        self.simulation = simulation
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = None
+        self.router = None
+        self.server = None
+        self.inflight = {}
+        self.counters = {'requests': 0, 'searches': 0, 'coalesced': 0, 'errors': 0, 'connections': 0}
+    
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        self.pending = asyncio.Semaphore(self.max_pending)
+        self.simulation.city_grid.update_dynamic_obstacles(self.simulation.time_step)
+        self.router = self.simulation.get_batch_router(self.workers)
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._handle, path=path, limit=READ_LIMIT)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port, limit=READ_LIMIT)
+        return self.server
+    
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        self.simulation.close_batch_router()
+    
+    async def _handle(self, reader, writer):
+        self.counters['connections'] += 1
+        lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await self.pending.acquire()
+                task = asyncio.ensure_future(self._respond(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+    
+    async def _respond(self, line, writer, lock):
+        try:
+            request = None
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+                response = await self.dispatch(request)
+            except Exception as error:
+                self.counters['errors'] += 1
+                response = {'error': str(error)}
+            if isinstance(request, dict) and 'id' in request:
+                response['id'] = request['id']
+            async with lock:
+                writer.write((json.dumps(response) + "\n").encode())
+                await writer.drain()
+        finally:
+            self.pending.release()
+    
+    async def dispatch(self, request):
+        op = request.get('op', 'route')
+        if op == 'route':
+            return await self.route(_position(request.get('start'), 'start'), _position(request.get('goal'), 'goal'),
+                                    request.get('algorithm', self.simulation.current_algorithm),
+                                    int(request.get('time_step', self.simulation.time_step)),
+                                    bool(request.get('include_path', False)))
+        if op == 'sample':
+            return {'pairs': self.sample(int(request.get('count', 1)), request.get('seed'))}
+        if op == 'info':
+            city = self.simulation.city_grid
+            return {'map_type': city.map_type, 'size': city.size, 'start': list(city.start_pos), 'goal': list(city.goal_pos),
+                    'time_step': self.simulation.time_step, 'algorithms': list(ALGORITHMS) + list(PLANNERS)}
+        if op == 'stats':
+            return dict(self.counters, inflight=len(self.inflight), workers=self.router.workers)
+        raise ValueError(f"Unknown op: {op}")
+    
+    async def route(self, start, goal, algorithm, time_step, include_path=False):
+        if algorithm not in ALGORITHMS and algorithm not in PLANNERS:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        self.counters['requests'] += 1
+        key = (algorithm, start, goal, time_step)
+        future = self.inflight.get(key)
+        coalesced = future is not None
+        if coalesced:
+            self.counters['coalesced'] += 1
+        else:
+            self.counters['searches'] += 1
+            future = asyncio.wrap_future(self.router.submit([(start, goal)], algorithm, time_step))
+            self.inflight[key] = future
+            future.add_done_callback(lambda _: self.inflight.pop(key, None))
+        result = (await asyncio.shield(future))[0]
+        response = result.to_dict(include_path=include_path)
+        response.update(time_step=time_step, coalesced=coalesced)
+        return response
+    
+    def sample(self, count, seed=None):
+        city = self.simulation.city_grid
+        cells = np.flatnonzero(city.grid.ravel() != -1)
+        if cells.size == 0:
+            return []
+        picks = np.random.default_rng(seed).choice(cells, size=(count, 2))
+        return [[list(divmod(int(start), city.size)), list(divmod(int(goal), city.size))] for start, goal in picks]
+
+async def serve(simulation, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, workers=None, max_pending=MAX_PENDING):
+    route_server = RouteServer(simulation, workers, max_pending)
+    server = await route_server.start(host, port, path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await route_server.close()
+
+def run_server(simulation, **options):
+    try:
+        asyncio.run(serve(simulation, **options))
+    except KeyboardInterrupt:
+        pass
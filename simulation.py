@@ -1,19 +1,67 @@
 import time
+from collections import OrderedDict, deque
+from contextlib import nullcontext
 from pathfinding import Pathfinder, PathfindingResult
-from utils import calculate_path_cost
+from dstar_lite import DStarLite
+from batch import BatchRouter
+from distance_field import compute_distance_field
+from hierarchical import HierarchicalPlanner
+from cooperative import CooperativePlanner, WINDOW, BUDGET_MS
+from tour import TourPlanner, TIME_LIMIT_MS
+from goal_tree import GoalTree, MAX_GOAL_TREES
+from route_cache import RouteCache
+from instrumentation import Instrumentation, summarize, HISTOGRAM_BINS
+from result_log import ResultLog
+from utils import calculate_path_cost, is_valid_position
+
+ALGORITHMS = {
+    "BFS": "bfs",
+    "Uniform Cost": "uniform_cost_search",
+    "A*": "a_star",
+    "A* (ALT)": "a_star_alt",
+    "Greedy Best-First": "greedy_best_first",
+    "Bidirectional A*": "bidirectional_a_star",
+    "Bidirectional UCS": "bidirectional_ucs",
+    "Jump Point Search": "jump_point_search",
+    "Weighted A*": "weighted_a_star",
+    "ARA*": "ara_star"
+}
+
+PLANNERS = {
+    "D* Lite": "_run_incremental",
+    "Dijkstra Field": "_run_distance_field",
+    "HPA*": "_run_hierarchical",
+    "Space-Time A*": "_run_space_time",
+    "Goal Tree": "_run_goal_tree"
+}
+
+TIMED_PLANNERS = {"Space-Time A*"}
+
+MAX_DISTANCE_FIELDS = 8
+ROUTE_CACHE_BYTES = 64 * 1024 * 1024
+HISTORY_LIMIT = 10000
 
 class Simulation:
-    def __init__(self, city_grid):
+    def __init__(self, city_grid, route_cache_bytes=ROUTE_CACHE_BYTES, landmark_dir=None, history_limit=HISTORY_LIMIT):
         self.city_grid = city_grid
-        self.pathfinder = Pathfinder(city_grid)
+        self.pathfinder = Pathfinder(city_grid, landmark_dir)
         self.current_algorithm = "A*"
         self.time_step = 0
         self.current_path = None
-        self.results_history = []
+        self.results_history = deque(maxlen=history_limit)
+        self.result_log = None
+        self.incremental_planner = None
+        self.batch_router = None
+        self.distance_fields = {}
+        self.goal_trees = OrderedDict()
+        self.hierarchical_planner = HierarchicalPlanner(city_grid)
+        self.fleet = None
+        self.tour_planner = TourPlanner(city_grid, self.pathfinder)
+        self.route_cache = RouteCache(route_cache_bytes)
+        self.instrumentation = None
     
     def set_algorithm(self, algorithm_name):
-        valid_algorithms = ["BFS", "Uniform Cost", "A*", "Greedy Best-First"]
-        if algorithm_name in valid_algorithms:
+        if algorithm_name in ALGORITHMS or algorithm_name in PLANNERS:
             self.current_algorithm = algorithm_name
             return True
         return False
@@ -23,30 +71,221 @@ class Simulation:
         if success:
             self.time_step = 0
             self.current_path = None
-            self.results_history = []
+            self.results_history.clear()
+            self.clear_search_state()
+            self.close_batch_router()
+            self.fleet = None
         return success
     
     def run_pathfinding(self):
+        started = time.perf_counter_ns()
         self.city_grid.update_dynamic_obstacles(self.time_step)
+        obstacles_ns = time.perf_counter_ns() - started
+        result = self.route(self.city_grid.start_pos, self.city_grid.goal_pos)
+        if result.metrics is not None:
+            result.metrics['obstacles_ns'] = obstacles_ns
+            result.metrics['total_ns'] = time.perf_counter_ns() - started
+        self.current_path = result.path
+        self.results_history.append(result)
+        if self.result_log is not None:
+            self.result_log.write(result, time_step=self.time_step)
+        return result
+    
+    def route(self, start, goal, algorithm=None):
+        algorithm = algorithm or self.current_algorithm
         start_time = time.time()
-        
-        if self.current_algorithm == "BFS":
-            path, nodes_expanded = self.pathfinder.bfs(self.city_grid.start_pos, self.city_grid.goal_pos)
-        elif self.current_algorithm == "Uniform Cost":
-            path, nodes_expanded = self.pathfinder.uniform_cost_search(self.city_grid.start_pos, self.city_grid.goal_pos)
-        elif self.current_algorithm == "A*":
-            path, nodes_expanded = self.pathfinder.a_star(self.city_grid.start_pos, self.city_grid.goal_pos)
-        elif self.current_algorithm == "Greedy Best-First":
-            path, nodes_expanded = self.pathfinder.greedy_best_first(self.city_grid.start_pos, self.city_grid.goal_pos)
-        
+        key = (algorithm, tuple(start), tuple(goal), self.city_grid.grid_version,
+               self.time_step if algorithm in TIMED_PLANNERS else None)
+        probe = self.instrumentation
+        started = time.perf_counter_ns()
+        cached = self.route_cache.get(key)
+        if cached is not None:
+            result = cached.cached_copy(time.time() - start_time)
+            if probe is not None:
+                result.metrics = probe.record({'total_ns': time.perf_counter_ns() - started}, {}, 0)
+            return result
+        profiler = probe.profiler() if probe is not None else None
+        searching = time.perf_counter_ns()
+        with profiler or nullcontext():
+            path, nodes_expanded = self.search(start, goal, algorithm)
+        searched = time.perf_counter_ns()
+        path_cost = self.route_cost(path)
+        finished = time.perf_counter_ns()
         execution_time = time.time() - start_time
-        path_cost = calculate_path_cost(path, self.city_grid.terrain_costs) if path else 0
-        
-        result = PathfindingResult(self.current_algorithm, path, nodes_expanded, execution_time, path_cost)
-        self.current_path = path
-        self.results_history.append(result)
+        stats = self.pathfinder.last_stats
+        result = PathfindingResult(algorithm, path, nodes_expanded, execution_time, path_cost, epsilon=stats.get('epsilon'))
+        if probe is not None:
+            phases = {'search_ns': searched - searching, 'cost_ns': finished - searched, 'total_ns': finished - started}
+            result.metrics = probe.record(phases, stats, nodes_expanded, profiler)
+        self.route_cache.put(key, result)
         return result
     
+    def open_result_log(self, target, include_path=False):
+        self.close_result_log()
+        self.result_log = ResultLog(target, include_path)
+        return self.result_log
+    
+    def close_result_log(self):
+        if self.result_log is not None:
+            self.result_log.close()
+            self.result_log = None
+    
+    def enable_instrumentation(self, profile=None):
+        self.instrumentation = Instrumentation(profile)
+        return self.instrumentation
+    
+    def disable_instrumentation(self):
+        self.instrumentation = None
+    
+    def metrics_summary(self, bins=HISTOGRAM_BINS):
+        return summarize(self.results_history, bins)
+    
+    def route_cost(self, path):
+        return calculate_path_cost(path, self.city_grid.terrain_costs) if path else 0
+    
+    def clear_search_state(self):
+        self.incremental_planner = None
+        self.distance_fields = {}
+        self.goal_trees.clear()
+        self.route_cache.clear()
+    
+    def cache_stats(self):
+        return self.route_cache.stats()
+    
+    def search(self, start, goal, algorithm=None):
+        algorithm = algorithm or self.current_algorithm
+        self.pathfinder.last_stats = {}
+        if algorithm in PLANNERS:
+            return getattr(self, PLANNERS[algorithm])(start, goal)
+        return getattr(self.pathfinder, ALGORITHMS[algorithm])(start, goal)
+    
+    def route_batch(self, pairs, algorithm=None, workers=None):
+        algorithm = algorithm or self.current_algorithm
+        self.city_grid.update_dynamic_obstacles(self.time_step)
+        if workers == 1:
+            return [self.route(start, goal, algorithm) for start, goal in pairs]
+        return self.get_batch_router(workers).route(pairs, algorithm, self.time_step)
+    
+    def get_batch_router(self, workers=None):
+        router = self.batch_router
+        if router is None or router.generation != self.city_grid.generation or (workers and router.workers != workers):
+            self.close_batch_router()
+            router = BatchRouter(self.city_grid, workers, self.pathfinder.landmark_dir)
+            self.batch_router = router
+        return router
+    
+    def close_batch_router(self):
+        if self.batch_router is not None:
+            self.batch_router.close()
+            self.batch_router = None
+    
+    def start_fleet(self, pairs, window=WINDOW, budget_ms=BUDGET_MS):
+        self.city_grid.update_dynamic_obstacles(self.time_step)
+        self.pathfinder.landmarks()
+        self.fleet = CooperativePlanner(self.city_grid, self.pathfinder, window, budget_ms)
+        for start, goal in pairs:
+            self.fleet.add_agent(start, goal)
+        return self.fleet
+    
+    def advance_fleet(self):
+        self.city_grid.update_dynamic_obstacles(self.time_step)
+        results = self.fleet.step(self.time_step)
+        self.next_time_step()
+        return results
+    
+    def plan_tour(self, stops, depot=None, time_limit_ms=TIME_LIMIT_MS, return_to_depot=True):
+        self.city_grid.update_dynamic_obstacles(self.time_step)
+        return self.tour_planner.plan(depot or self.city_grid.start_pos, stops, time_limit_ms, return_to_depot)
+    
+    def _run_incremental(self, start, goal):
+        if not is_valid_position(self.city_grid.grid, start) or not is_valid_position(self.city_grid.grid, goal):
+            return None, 0
+        planner = self.incremental_planner
+        if planner is None or planner.goal != goal or planner.generation != self.city_grid.generation:
+            planner = DStarLite(self.city_grid, start, goal)
+            self.incremental_planner = planner
+        return planner.plan(start)
+    
+    def plan_hierarchical(self, start, goal):
+        self.city_grid.update_dynamic_obstacles(self.time_step)
+        return self.hierarchical_planner.plan(start, goal)
+    
+    def _run_hierarchical(self, start, goal):
+        route, nodes_expanded = self.hierarchical_planner.plan(start, goal)
+        return (route.path() if route else None), nodes_expanded
+    
+    def _run_space_time(self, start, goal):
+        return self.pathfinder.space_time_a_star(start, goal, self.time_step)
+    
+    def get_distance_field(self, source=None):
+        source = tuple(source or self.city_grid.start_pos)
+        key = (source, self.time_step, self.city_grid.generation)
+        field = self.distance_fields.get(key)
+        if field is None:
+            self.city_grid.update_dynamic_obstacles(self.time_step)
+            if not is_valid_position(self.city_grid.grid, source):
+                return None
+            field = compute_distance_field(self.city_grid, source)
+            if len(self.distance_fields) >= MAX_DISTANCE_FIELDS:
+                del self.distance_fields[next(iter(self.distance_fields))]
+            self.distance_fields[key] = field
+        return field
+    
+    def route_from_source(self, goals, source=None):
+        field = self.get_distance_field(source)
+        grid = self.city_grid.grid
+        results = []
+        for goal in goals:
+            start_time = time.time()
+            path = field.path_to(goal) if field is not None and is_valid_position(grid, goal) else None
+            execution_time = time.time() - start_time
+            results.append(PathfindingResult("Dijkstra Field", path, 0, execution_time, self.route_cost(path)))
+        return results
+    
+    def get_goal_tree(self, goal=None):
+        goal = tuple(goal or self.city_grid.goal_pos)
+        size = self.city_grid.size
+        if not (0 <= goal[0] < size and 0 <= goal[1] < size) or self.city_grid.grid[goal] == -1:
+            return None
+        tree = self.goal_trees.pop(goal, None)
+        if tree is None:
+            tree = GoalTree(self.city_grid, goal)
+        else:
+            tree.sync()
+        if len(self.goal_trees) >= MAX_GOAL_TREES:
+            self.goal_trees.popitem(last=False)
+        self.goal_trees[goal] = tree
+        return tree
+    
+    def route_to_goal(self, starts, goal=None):
+        self.city_grid.update_dynamic_obstacles(self.time_step)
+        tree = self.get_goal_tree(goal)
+        grid = self.city_grid.grid
+        results = []
+        for start in starts:
+            start_time = time.time()
+            path = tree.path_from(start) if tree is not None and is_valid_position(grid, start) else None
+            execution_time = time.time() - start_time
+            results.append(PathfindingResult("Goal Tree", path, 0, execution_time, tree.cost_from(start) if path else 0))
+        return results
+    
+    def _run_goal_tree(self, start, goal):
+        if not is_valid_position(self.city_grid.grid, start):
+            return None, 0
+        tree = self.get_goal_tree(goal)
+        if tree is None:
+            return None, 0
+        return tree.path_from(start), tree.nodes_expanded
+    
+    def _run_distance_field(self, start, goal):
+        if not is_valid_position(self.city_grid.grid, start) or not is_valid_position(self.city_grid.grid, goal):
+            return None, 0
+        cached = (tuple(start), self.time_step, self.city_grid.generation) in self.distance_fields
+        field = self.get_distance_field(start)
+        if field is None:
+            return None, 0
+        return field.path_to(goal), 0 if cached else field.nodes_expanded
+    
     def next_time_step(self):
         self.time_step += 1
         self.current_path = None
@@ -61,7 +300,10 @@ class Simulation:
     def reset_simulation(self):
         self.time_step = 0
         self.current_path = None
-        self.results_history = []
+        self.results_history.clear()
+        self.clear_search_state()
+        self.close_batch_router()
+        self.fleet = None
         self.city_grid.generate_city()
     
     def get_simulation_state(self):
@@ -72,5 +314,6 @@ class Simulation:
             'has_path': self.current_path is not None,
             'grid_info': self.city_grid.get_grid_info(),
             'current_path': self.current_path,
-            'has_dynamic_obstacles': len(self.city_grid.dynamic_obstacles) > 0
+            'has_dynamic_obstacles': len(self.city_grid.dynamic_obstacles) > 0,
+            'traffic_timeline': self.city_grid.timeline_stats()
         }
\ No newline at end of file
@@ -0,0 +1,180 @@
+import time
+import numpy as np
+from distance_field import distance_matrix
+from utils import calculate_path_cost
+
+TIME_LIMIT_MS = 1000
+MAX_SEGMENT = 3
+NEAREST_EXACT = 16
+
+class TourPlan:
+    def __init__(self, depot, order, path, path_cost, estimated_cost, unreachable, nodes_expanded, execution_time):
+        self.depot = depot
+        self.order = order
+        self.path = path
+        self.path_cost = path_cost
+        self.estimated_cost = estimated_cost
+        self.unreachable = unreachable
+        self.nodes_expanded = nodes_expanded
+        self.execution_time = execution_time
+        self.success = path is not None
+    
+    def to_dict(self, include_path=False):
+        record = {
+            'depot': list(self.depot),
+            'order': [list(stop) for stop in self.order],
+            'unreachable': [list(stop) for stop in self.unreachable],
+            'path_cost': float(self.path_cost),
+            'estimated_cost': float(self.estimated_cost),
+            'nodes_expanded': int(self.nodes_expanded),
+            'execution_time': self.execution_time,
+            'path_length': len(self.path) if self.path else 0
+        }
+        if include_path:
+            record['path'] = [list(position) for position in self.path] if self.path else None
+        return record
+
+def _tour_cost(matrix, tour):
+    return float(matrix[tour[:-1], tour[1:]].sum())
+
+def _nearest_neighbour(matrix):
+    count = len(matrix)
+    tour = [0]
+    visited = np.zeros(count, dtype=bool)
+    visited[0] = True
+    for _ in range(count - 1):
+        row = np.where(visited, np.inf, matrix[tour[-1]])
+        tour.append(int(np.argmin(row)))
+        visited[tour[-1]] = True
+    return tour
+
+def _two_opt(matrix, tour, deadline):
+    last = len(tour) - 1
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        forward = np.concatenate([[0.0], np.cumsum(matrix[tour[:-1], tour[1:]])])
+        backward = np.concatenate([[0.0], np.cumsum(matrix[tour[1:], tour[:-1]])])
+        for i in range(last - 1):
+            j = np.arange(i + 2, last)
+            if j.size == 0:
+                break
+            a, b, c, d = tour[i], tour[i + 1], tour[j], tour[j + 1]
+            delta = (matrix[a, c] + matrix[b, d] + backward[j] - backward[i + 1]
+                     - matrix[a, b] - matrix[c, d] - forward[j] + forward[i + 1])
+            delta[np.isnan(delta)] = np.inf
+            best = int(np.argmin(delta))
+            if delta[best] < -1e-9:
+                end = j[best]
+                tour[i + 1:end + 1] = tour[i + 1:end + 1][::-1].copy()
+                improved = True
+                break
+    return tour
+
+def _or_opt(matrix, tour, deadline):
+    last = len(tour) - 1
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for length in range(1, MAX_SEGMENT + 1):
+            for start in range(1, last - length + 1):
+                end = start + length - 1
+                before, first, final, after = tour[start - 1], tour[start], tour[end], tour[end + 1]
+                removed = matrix[before, after] - matrix[before, first] - matrix[final, after]
+                rest = np.concatenate([tour[:start], tour[end + 1:]])
+                gaps = np.arange(len(rest) - 1)
+                gaps = gaps[(gaps != start - 1)]
+                delta = removed + matrix[rest[gaps], first] + matrix[final, rest[gaps + 1]] - matrix[rest[gaps], rest[gaps + 1]]
+                if delta.size == 0:
+                    continue
+                delta[np.isnan(delta)] = np.inf
+                best = int(np.argmin(delta))
+                if delta[best] < -1e-9:
+                    gap = gaps[best]
+                    tour = np.concatenate([rest[:gap + 1], tour[start:end + 1], rest[gap + 1:]])
+                    improved = True
+                    break
+            if improved or time.perf_counter() >= deadline:
+                break
+    return tour
+
+class TourPlanner:
+    def __init__(self, city_grid, pathfinder):
+        self.city_grid = city_grid
+        self.pathfinder = pathfinder
+        self.pair_costs = {}
+        self.grid_version = None
+    
+    def cost_matrix(self, points):
+        if self.grid_version != self.city_grid.grid_version:
+            self.pair_costs = {}
+            self.grid_version = self.city_grid.grid_version
+        pair_costs = self.pair_costs
+        terrain = self.city_grid.terrain_costs
+        nearest = NEAREST_EXACT if len(points) > NEAREST_EXACT + 1 else None
+        needed = len(points) if nearest is None else nearest
+        sources = [source for source in points if sum((source, target) in pair_costs for target in points) < needed]
+        nodes_expanded = 0
+        if sources:
+            exact, nodes_expanded = distance_matrix(self.city_grid, sources, points, nearest)
+            for source, row in zip(sources, exact.tolist()):
+                for target, cost in zip(points, row):
+                    if nearest is None or cost != float("inf"):
+                        pair_costs[(source, target)] = cost
+                        pair_costs[(target, source)] = cost - float(terrain[target]) + float(terrain[source])
+        if nearest is None:
+            matrix = np.full((len(points), len(points)), np.inf)
+        else:
+            matrix = self.pathfinder.landmarks().bounds(points, points)
+        for i, source in enumerate(points):
+            for j, target in enumerate(points):
+                cost = pair_costs.get((source, target))
+                if cost is not None:
+                    matrix[i, j] = cost
+        return matrix, nodes_expanded
+    
+    def plan(self, depot, stops, time_limit_ms=TIME_LIMIT_MS, return_to_depot=True):
+        start_time = time.perf_counter()
+        deadline = start_time + time_limit_ms / 1000.0
+        depot = tuple(depot)
+        points = [depot] + list(dict.fromkeys(tuple(stop) for stop in stops if tuple(stop) != depot))
+        matrix, nodes_expanded = self.cost_matrix(points)
+        reachable = np.isfinite(matrix[0]) & np.isfinite(matrix[:, 0])
+        unreachable = [points[i] for i in np.flatnonzero(~reachable)]
+        keep = np.flatnonzero(reachable)
+        points = [points[i] for i in keep]
+        matrix = matrix[np.ix_(keep, keep)]
+        count = len(points)
+        order = _nearest_neighbour(matrix)
+        if return_to_depot:
+            search_matrix, tour = matrix, np.array(order + [0])
+        else:
+            search_matrix = np.full((count + 1, count + 1), np.inf)
+            search_matrix[:count, :count] = matrix
+            search_matrix[:, count] = 0
+            search_matrix[count, 0] = 0
+            tour = np.array(order + [count, 0])
+        if count > 2:
+            while time.perf_counter() < deadline:
+                cost = _tour_cost(search_matrix, tour)
+                tour = _or_opt(search_matrix, _two_opt(search_matrix, tour, deadline), deadline)
+                if _tour_cost(search_matrix, tour) >= cost - 1e-9:
+                    break
+        if not return_to_depot:
+            tour = tour[:-2]
+        path = [depot]
+        order = []
+        current = 0
+        for stop in tour[1:]:
+            leg, expanded = self.pathfinder.a_star(points[current], points[stop])
+            nodes_expanded += expanded
+            if leg is None:
+                unreachable.append(points[stop])
+                continue
+            path.extend(leg[1:])
+            current = stop
+            if stop != 0:
+                order.append(points[stop])
+        path_cost = calculate_path_cost(path, self.city_grid.terrain_costs) if path else 0
+        return TourPlan(depot, order, path, path_cost, _tour_cost(matrix, tour), unreachable, nodes_expanded,
+                        time.perf_counter() - start_time)
@@ -25,8 +25,5 @@ def get_neighbors(position, grid_size):
 def calculate_path_cost(path, terrain_costs):
     if not path or len(path) < 2:
         return 0
-    total_cost = 0
-    for i in range(1, len(path)):
-        x, y = path[i]
-        total_cost += terrain_costs[x, y]
-    return total_cost
\ No newline at end of file
+    rows, cols = zip(*path[1:])
+    return float(terrain_costs[rows, cols].sum(dtype=np.float64))
\ No newline at end of file
@@ -1,6 +1,48 @@
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Button, RadioButtons
 import numpy as np
+from simulation import ALGORITHMS, PLANNERS
+
+ROAD, GRASS, MUD, BUILDING, TRAFFIC, START, GOAL = range(7)
+
+PALETTE = np.array([
+    [230, 230, 230, 255],
+    [178, 255, 178, 255],
+    [153, 102, 51, 255],
+    [77, 77, 77, 255],
+    [255, 128, 0, 255],
+    [0, 255, 0, 255],
+    [255, 0, 0, 255]
+], dtype=np.uint8)
+
+MAX_GRID_LINES = 50
+
+MAP_DESCRIPTIONS = {
+    "small": "Simple 10x10 layout for quick testing and algorithm learning",
+    "medium": "Balanced 15x15 city with varied terrain and obstacles", 
+    "large": "Complex 20x20 urban environment with extensive road network",
+    "dynamic": "15x15 map with moving vehicles - paths change over time!",
+    "procedural": "Seeded generated city for large-scale runs",
+    "custom": "City built from supplied arrays"
+}
+
+ALGORITHM_DESCRIPTIONS = {
+    "BFS": "Finds shortest path by steps, ignores terrain costs",
+    "Uniform Cost": "Finds cheapest path considering terrain costs", 
+    "A*": "Optimal balance of speed and cost efficiency (recommended)",
+    "Greedy Best-First": "Fast but may not find optimal path",
+    "D* Lite": "Repairs the previous search as traffic moves",
+    "Dijkstra Field": "One search from the start answers every goal",
+    "Bidirectional A*": "A* from both ends, meeting in the middle",
+    "Bidirectional UCS": "Cheapest path searched from both ends",
+    "Jump Point Search": "A* that jumps across open road, optimal on uniform-cost cells",
+    "A* (ALT)": "A* guided by landmark distances that see around buildings and terrain",
+    "Weighted A*": "A* with an inflated heuristic, at most twice the optimal cost",
+    "ARA*": "Anytime A*: a quick bounded path, tightened until the deadline",
+    "Space-Time A*": "Plans around where traffic will be, waiting in place if needed",
+    "HPA*": "A* over precomputed cluster entrances, refined locally (near-optimal)",
+    "Goal Tree": "One reverse search from the goal answers every start, repaired as traffic moves"
+}
 
 class CityVisualizer:
     def __init__(self, simulation):
@@ -8,6 +50,10 @@ class CityVisualizer:
         self.fig = None
         self.ax = None
         self.control_ax = None
+        self.image = None
+        self.background = None
+        self.base_codes = None
+        self.base_key = None
         self.setup_ui()
     
     def setup_ui(self):
@@ -22,9 +68,12 @@ class CityVisualizer:
         self.results_ax = plt.axes([0.05, 0.3, 0.4, 0.12])
         self.results_ax.axis('off')
 
-        algo_ax = plt.axes([0.05, 0.18, 0.25, 0.1])
-        self.algorithm_selector = RadioButtons(algo_ax, ['BFS', 'Uniform Cost', 'A*', 'Greedy Best-First'])
-        self.algorithm_selector.set_active(2)
+        algo_ax = plt.axes([0.05, 0.01, 0.25, 0.27])
+        algorithms = list(ALGORITHMS) + list(PLANNERS)
+        self.algorithm_selector = RadioButtons(algo_ax, algorithms)
+        for label in self.algorithm_selector.labels:
+            label.set_fontsize(8)
+        self.algorithm_selector.set_active(algorithms.index(self.simulation.current_algorithm))
 
         map_ax = plt.axes([0.35, 0.18, 0.25, 0.1])
         self.map_selector = RadioButtons(map_ax, ['Small', 'Medium', 'Large', 'Dynamic'])
@@ -45,8 +94,55 @@ class CityVisualizer:
         self.next_step_btn.on_clicked(self.on_next_step)
         self.step_back_btn.on_clicked(self.on_previous_step)
         
+        self.create_artists()
+        self.fig.canvas.mpl_connect('draw_event', self.on_draw)
         self.update_display()
     
+    def create_artists(self):
+        self.path_line, = self.ax.plot([], [], 'b-', marker='o', markersize=5, linewidth=3, alpha=0.8,
+                                       label='Path', animated=True)
+        self.title = self.ax.set_title('', fontsize=14, pad=10, animated=True)
+        
+        self.legend_ax.text(0.1, 0.95, "MAP LEGEND", fontsize=14, fontweight='bold', 
+                           bbox=dict(boxstyle='round', facecolor='lightgray', alpha=0.8))
+        legend_items = [
+            ('Start Position', 'green'),
+            ('Goal Position', 'red'),
+            ('Buildings (Blocked)', 'darkgray'),
+            ('Moving Vehicles', 'orange'),
+            ('Grass (Cost: 2)', 'lightgreen'),
+            ('Mud (Cost: 3)', 'brown'),
+            ('Roads (Cost: 1)', 'lightgray'),
+            ('Calculated Path', 'blue')
+        ]
+        y_positions = [0.85, 0.75, 0.65, 0.55, 0.45, 0.35, 0.25, 0.15]
+        for (label, color), y_pos in zip(legend_items, y_positions):
+            self.legend_ax.add_patch(plt.Rectangle((0.1, y_pos-0.03), 0.08, 0.06, 
+                                                 facecolor=color, edgecolor='black'))
+            self.legend_ax.text(0.25, y_pos, label, fontsize=11, verticalalignment='center')
+        
+        self.results_ax.text(0.02, 0.85, "PATHFINDING RESULTS", fontsize=13, fontweight='bold',
+                           bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.8))
+        self.results_text = self.results_ax.text(0.02, 0.5, '', fontsize=11, verticalalignment='top', animated=True,
+                                                 bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.7))
+        
+        self.info_ax.text(0.02, 0.85, "MAP INFORMATION", fontsize=13, fontweight='bold',
+                         bbox=dict(boxstyle='round', facecolor='lightyellow', alpha=0.8))
+        self.info_text = self.info_ax.text(0.02, 0.5, '', fontsize=10, verticalalignment='top', animated=True,
+                                           bbox=dict(boxstyle='round', facecolor='lavender', alpha=0.7))
+    
+    def animated_artists(self):
+        return [self.image, self.path_line, self.title, self.results_text, self.info_text]
+    
+    def on_draw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_animated()
+    
+    def draw_animated(self):
+        for artist in self.animated_artists():
+            if artist is not None:
+                self.fig.draw_artist(artist)
+    
     def on_algorithm_change(self, label):
         self.simulation.set_algorithm(label)
         self.update_display()
@@ -77,137 +173,104 @@ class CityVisualizer:
         print(f"Time step: {new_time}")
         self.update_display()
     
+    def display_scale(self, size):
+        pixels = max(self.ax.bbox.width, self.ax.bbox.height, 1)
+        return max(1, int(np.ceil(size / pixels)))
+    
+    def render_grid(self):
+        city = self.simulation.city_grid
+        scale = self.display_scale(city.size)
+        key = (id(city), city.generation, scale)
+        if self.base_key != key:
+            codes = np.full(city.grid.shape, ROAD, dtype=np.uint8)
+            codes[city.terrain_costs == 2] = GRASS
+            codes[city.terrain_costs == 3] = MUD
+            codes[city.grid == -1] = BUILDING
+            if scale > 1:
+                blocks = -(-city.size // scale)
+                padded = np.zeros((blocks * scale, blocks * scale), dtype=np.uint8)
+                padded[:city.size, :city.size] = codes
+                codes = padded.reshape(blocks, scale, blocks, scale).max(axis=(1, 3))
+            self.base_codes = codes
+            self.base_key = key
+        codes = self.base_codes.copy()
+        rows, cols = np.divmod(city.traffic_cells, city.size)
+        codes[rows // scale, cols // scale] = TRAFFIC
+        codes[city.start_pos[0] // scale, city.start_pos[1] // scale] = START
+        codes[city.goal_pos[0] // scale, city.goal_pos[1] // scale] = GOAL
+        return PALETTE[codes], codes.shape[0] * scale
+    
+    def configure_map_axes(self, size):
+        self.ax.set_xlim(0, size)
+        self.ax.set_ylim(size, 0)
+        if size <= MAX_GRID_LINES:
+            self.ax.set_xticks(np.arange(0, size + 1, 1))
+            self.ax.set_yticks(np.arange(0, size + 1, 1))
+            self.ax.grid(True, color='black', linestyle='-', linewidth=0.5, alpha=0.3)
+        else:
+            self.ax.set_xticks([])
+            self.ax.set_yticks([])
+            self.ax.grid(False)
+    
     def update_display(self):
-
-        self.ax.clear()
-        self.legend_ax.clear()
-        self.results_ax.clear()
-        self.info_ax.clear()
+        city = self.simulation.city_grid
+        size = city.size
+        map_type = city.map_type
+        has_dynamic = len(city.dynamic_obstacles) > 0
+        colors, extent = self.render_grid()
         
-        grid_info = self.simulation.city_grid.get_grid_info()
-        grid = grid_info['grid']
-        terrain_costs = grid_info['terrain_costs']
-        start_pos = grid_info['start_pos']
-        goal_pos = grid_info['goal_pos']
-        size = grid_info['size']
-        map_type = grid_info['map_type']
-        has_dynamic = grid_info['has_dynamic_obstacles']
-
-        vis_grid = np.zeros((size, size, 3))
+        layout_changed = self.image is None or self.image.get_array().shape != colors.shape or self.ax.get_xlim()[1] != size
+        if self.image is None:
+            self.image = self.ax.imshow(colors, origin='upper', extent=[0, extent, extent, 0],
+                                        interpolation='nearest', animated=True)
+        else:
+            self.image.set_data(colors)
+            self.image.set_extent([0, extent, extent, 0])
+        if layout_changed:
+            self.configure_map_axes(size)
         
-        for i in range(size):
-            for j in range(size):
-                if (i, j) == start_pos:
-                    vis_grid[i, j] = [0, 1, 0]  
-                elif (i, j) == goal_pos:
-                    vis_grid[i, j] = [1, 0, 0] 
-                elif grid[i, j] == -1:
-                    vis_grid[i, j] = [0.3, 0.3, 0.3] 
-                elif grid[i, j] == -2:
-                    vis_grid[i, j] = [1, 0.5, 0]  
-                elif terrain_costs[i, j] == 2:
-                    vis_grid[i, j] = [0.7, 1, 0.7] 
-                elif terrain_costs[i, j] == 3:
-                    vis_grid[i, j] = [0.6, 0.4, 0.2]  
-                else:
-                    vis_grid[i, j] = [0.9, 0.9, 0.9]  
-
-        self.ax.imshow(vis_grid, origin='upper', extent=[0, size, 0, size])
-
         if self.simulation.current_path:
-            path_y = [pos[0] for pos in self.simulation.current_path]
-            path_x = [pos[1] for pos in self.simulation.current_path]
-            self.ax.plot([x + 0.5 for x in path_x], [y + 0.5 for y in path_y], 
-                        'b-', linewidth=3, alpha=0.8, label='Path')
-            self.ax.scatter([x + 0.5 for x in path_x], [y + 0.5 for y in path_y], 
-                           c='blue', s=50, alpha=0.6)
-
-        self.ax.set_xticks(np.arange(0, size + 1, 1))
-        self.ax.set_yticks(np.arange(0, size + 1, 1))
-        self.ax.grid(True, color='black', linestyle='-', linewidth=0.5, alpha=0.3)
-
+            path = np.asarray(self.simulation.current_path)
+            self.path_line.set_data(path[:, 1] + 0.5, path[:, 0] + 0.5)
+        else:
+            self.path_line.set_data([], [])
+        
         title = f'City Map: {map_type.title()} ({size}x{size}) | Time Step: {self.simulation.time_step} | Algorithm: {self.simulation.current_algorithm}'
         if has_dynamic:
             title += " | Dynamic Objects"
-        self.ax.set_title(title, fontsize=14, pad=10)
-
-        self.legend_ax.axis('off')
-        legend_title = "MAP LEGEND"
-        self.legend_ax.text(0.1, 0.95, legend_title, fontsize=14, fontweight='bold', 
-                           bbox=dict(boxstyle='round', facecolor='lightgray', alpha=0.8))
-
-        legend_items = [
-            ('Start Position', 'green'),
-            ('Goal Position', 'red'),
-            ('Buildings (Blocked)', 'darkgray'),
-            ('Moving Vehicles', 'orange'),
-            ('Grass (Cost: 2)', 'lightgreen'),
-            ('Mud (Cost: 3)', 'brown'),
-            ('Roads (Cost: 1)', 'lightgray'),
-            ('Calculated Path', 'blue')
-        ]
-        
-        y_positions = [0.85, 0.75, 0.65, 0.55, 0.45, 0.35, 0.25, 0.15]
-        
-        for i, (label, color) in enumerate(legend_items):
-            y_pos = y_positions[i]
-
-            self.legend_ax.add_patch(plt.Rectangle((0.1, y_pos-0.03), 0.08, 0.06, 
-                                                 facecolor=color, edgecolor='black'))
-         
-            self.legend_ax.text(0.25, y_pos, label, fontsize=11, verticalalignment='center')
-
-        self.results_ax.axis('off')
-        results_title = "PATHFINDING RESULTS"
-        self.results_ax.text(0.02, 0.85, results_title, fontsize=13, fontweight='bold',
-                           bbox=dict(boxstyle='round', facecolor='lightgreen', alpha=0.8))
+        self.title.set_text(title)
         
         if self.simulation.results_history:
             latest_result = self.simulation.results_history[-1]
             status_icon = "✅ SUCCESS" if latest_result.success else "❌ FAILED"
-            status_color = "green" if latest_result.success else "red"
             
             results_text = (f"Algorithm: {latest_result.algorithm_name}\n"
                           f"Status: {status_icon}\n"
                           f"Path Cost: {latest_result.path_cost}\n"
                           f"Nodes Expanded: {latest_result.nodes_expanded}\n"
                           f"Execution Time: {latest_result.execution_time:.4f}s\n"
-                          f"Path Length: {len(latest_result.path) if latest_result.path else 0} steps")
+                          f"Path Length: {latest_result.path_length} steps")
         else:
             results_text = "No path calculated yet.\nClick 'Find Path' to start!"
-        
-        self.results_ax.text(0.02, 0.5, results_text, fontsize=11, verticalalignment='top',
-                           bbox=dict(boxstyle='round', facecolor='lightblue', alpha=0.7))
-        
-        self.info_ax.axis('off')
-        info_title = "MAP INFORMATION"
-        self.info_ax.text(0.02, 0.85, info_title, fontsize=13, fontweight='bold',
-                         bbox=dict(boxstyle='round', facecolor='lightyellow', alpha=0.8))
-        
-        map_descriptions = {
-            "small": "Simple 10x10 layout for quick testing and algorithm learning",
-            "medium": "Balanced 15x15 city with varied terrain and obstacles", 
-            "large": "Complex 20x20 urban environment with extensive road network",
-            "dynamic": "15x15 map with moving vehicles - paths change over time!"
-        }
-        
-        algorithm_descriptions = {
-            "BFS": "Finds shortest path by steps, ignores terrain costs",
-            "Uniform Cost": "Finds cheapest path considering terrain costs", 
-            "A*": "Optimal balance of speed and cost efficiency (recommended)",
-            "Greedy Best-First": "Fast but may not find optimal path"
-        }
+        self.results_text.set_text(results_text)
         
         info_text = (f"Current Map: {map_type.title()} ({size}x{size})\n"
                     f"Dynamic Objects: {'Yes' if has_dynamic else 'No'}\n"
                     f"Time Step: {self.simulation.time_step}\n"
-                    f"\nMap Type: {map_descriptions[map_type]}\n"
-                    f"Algorithm: {algorithm_descriptions[self.simulation.current_algorithm]}")
+                    f"\nMap Type: {MAP_DESCRIPTIONS.get(map_type, '')}\n"
+                    f"Algorithm: {ALGORITHM_DESCRIPTIONS.get(self.simulation.current_algorithm, '')}")
+        self.info_text.set_text(info_text)
         
-        self.info_ax.text(0.02, 0.5, info_text, fontsize=10, verticalalignment='top',
-                         bbox=dict(boxstyle='round', facecolor='lavender', alpha=0.7))
-        
-        plt.draw()
+        self.refresh(layout_changed)
+    
+    def refresh(self, layout_changed=False):
+        canvas = self.fig.canvas
+        if layout_changed or self.background is None or not canvas.supports_blit:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self.background)
+        self.draw_animated()
+        canvas.blit(self.fig.bbox)
     
     def show(self):
         plt.show()
\ No newline at end of file